@@ -3,22 +3,13 @@ from nicegui import ui
 import asyncio
 import random
 import models
+import events
 import state
 import routing
-from structures.priority_queue import PriorityQueue
+from algorithms import vrp
 
-# Global reference to refresh_ui function, to be set by app.py
-_refresh_ui_callback = None
-
-# Set the UI refresh callback function
-def set_refresh_ui_callback(callback):
-    global _refresh_ui_callback
-    _refresh_ui_callback = callback
-
-# Trigger UI refresh
-def refresh_ui():
-    if _refresh_ui_callback:
-        _refresh_ui_callback()
+# Views are not refreshed from here: the state.* mutators publish events
+# (see events.py) and every open session updates the widgets they affect.
 
 # ---------- Utility / Business Logic ----------
 
@@ -31,21 +22,21 @@ def show_popup(message, type="info"):
     
     ui.notify(message, type=type if type in ['positive', 'negative', 'warning', 'info'] else 'info', color=color)
 
-# Save all application state to storage
-def save_all():
-    state.save_all()
+# Mark collections as changed; state flushes them to storage write-behind
+def save_all(*collections):
+    state.save_all(*collections)
 
 # ---------- Actions & domain functions ----------
 
 # Dispatch and empty a bin, logging the collection
-def dispatch_bin_logic(bin_id, silent=False, refresh=True, skip_undo=False):
+def dispatch_bin_logic(bin_id, silent=False, skip_undo=False):
     bin_obj = state.bins_map.get(bin_id)
     if not bin_obj:
         if not silent:
             show_popup("Bin not found", type="negative")
         return
     prev_fill = bin_obj.fill_level
-    bin_obj.fill_level = 0
+    state.set_fill_level(bin_obj, 0)
     record = {
         "timestamp": models.get_iso_timestamp(),
         "bin_id": bin_id,
@@ -55,15 +46,40 @@ def dispatch_bin_logic(bin_id, silent=False, refresh=True, skip_undo=False):
         "prev_fill": prev_fill,
         "source": "request"  # Track that this came from a request
     }
-    state.history.append(record)
+    state.append_history(record)
     # store undo info on stack (action, payload) - unless skip_undo is True
     if not skip_undo:
         state.request_stack.append(("dispatch", record))
-    save_all()
+    save_all("bins")
     if not silent:
         show_popup(f"Dispatched and emptied {bin_id}", type="positive")
-    if refresh:
-        refresh_ui()
+
+# Dispatch and empty many bins as one unit: one history batch, one grouped
+# undo entry and one persistence mark
+def dispatch_bins_batch(bin_ids, source="collection"):
+    timestamp = models.get_iso_timestamp()
+    records = []
+    for bin_id in bin_ids:
+        bin_obj = state.bins_map.get(bin_id)
+        if not bin_obj:
+            continue
+        prev_fill = bin_obj.fill_level
+        state.set_fill_level(bin_obj, 0)
+        records.append({
+            "timestamp": timestamp,
+            "bin_id": bin_id,
+            "type": bin_obj.waste_type,
+            "area": f"{bin_obj.lat:.4f},{bin_obj.lon:.4f}",
+            "status": "Collected",
+            "prev_fill": prev_fill,
+            "source": source
+        })
+    if not records:
+        return records
+    state.append_history_batch(records)
+    state.request_stack.append(("dispatch_batch", records))
+    save_all("bins")
+    return records
 
 # Create a new collection request for a specific bin
 def request_collection_action(bin_id):
@@ -77,9 +93,9 @@ def request_collection_action(bin_id):
         return
     
     req = models.CollectionRequest(bin_id=bin_id)
-    state.requests.append(req)
+    state.add_request(req)
     # Log to history
-    state.history.append({
+    state.append_history({
         "bin_id": bin_id,
         "timestamp": models.get_iso_timestamp(),
         "status": "Request Processed",
@@ -87,18 +103,18 @@ def request_collection_action(bin_id):
         "type": next((b.waste_type for b in state.bins if b.id == bin_id), "Unknown")
     })
     state.request_stack.append(("request_add", req))
-    save_all()
+    save_all("requests")
     show_popup(f"Request added for {bin_id}", type="positive")
-    refresh_ui()
 
 # Process the next pending collection request
 def process_request_action():
     if not state.requests:
         show_popup("No pending requests", type="info")
         return
-    req = state.requests.pop(0)
+    req = state.requests[0]
+    state.remove_request(req)
     # Log to history
-    state.history.append({
+    state.append_history({
         "bin_id": req.bin_id,
         "timestamp": models.get_iso_timestamp(),
         "status": "Request Processed",
@@ -107,8 +123,7 @@ def process_request_action():
     })
     # dispatch the bin
     dispatch_bin_logic(req.bin_id)
-    save_all()
-    refresh_ui()
+    save_all("requests")
 
 # Undo the last action (dispatch, request, update, or add bin)
 def undo_last_action():
@@ -124,42 +139,53 @@ def undo_last_action():
         # Restore fill level
         b = state.bins_map.get(entry["bin_id"])
         if b:
-            b.fill_level = entry.get("prev_fill", 0)
+            state.set_fill_level(b, entry.get("prev_fill", 0))
             # Remove from history
             if entry in state.history:
-                state.history.remove(entry)
-            save_all()
+                state.remove_history(entry)
+            save_all("bins")
             show_popup(f"Undo: Restored {b.id} to {b.fill_level}%", type="info")
             
+    elif action == "dispatch_batch":
+        # payload is the list of history records of one batch dispatch
+        records = payload
+        for entry in records:
+            b = state.bins_map.get(entry["bin_id"])
+            if b:
+                state.set_fill_level(b, entry.get("prev_fill", 0))
+        state.remove_history_batch(records)
+        save_all("bins")
+        show_popup(f"Undo: Restored {len(records)} bins from batch collection", type="info")
+            
     elif action == "request_add":
         # payload is request object - undo creating a request
         req = payload
         if req in state.requests:
-            state.requests.remove(req)
-            save_all()
+            state.remove_request(req)
+            save_all("requests")
             show_popup(f"Undo: Removed request for {req.bin_id}", type="info")
     
     elif action == "request_approve":
         # payload is request object - restore it to the queue and undo the dispatch
         req = payload
-        state.requests.append(req)
+        state.add_request(req)
         # Also need to undo the bin dispatch
         b = state.bins_map.get(req.bin_id)
         if b:
             # Find the most recent dispatch entry for this bin
             for entry in reversed(state.history):
                 if entry.get("bin_id") == req.bin_id and entry.get("status") == "Collected":
-                    b.fill_level = entry.get("prev_fill", 0)
-                    state.history.remove(entry)
+                    state.set_fill_level(b, entry.get("prev_fill", 0))
+                    state.remove_history(entry)
                     break
-        save_all()
+        save_all("requests", "bins")
         show_popup(f"Undo: Restored request for {req.bin_id} and undid dispatch", type="info")
     
     elif action == "request_reject":
         # payload is request object - restore it to the queue
         req = payload
-        state.requests.append(req)
-        save_all()
+        state.add_request(req)
+        save_all("requests")
         show_popup(f"Undo: Restored request for {req.bin_id}", type="info")
             
     elif action == "update_fill":
@@ -167,83 +193,79 @@ def undo_last_action():
         bid, old_fill = payload
         b = state.bins_map.get(bid)
         if b:
-            b.fill_level = old_fill
-            save_all()
+            state.set_fill_level(b, old_fill)
+            save_all("bins")
             show_popup(f"Undo: Restored {bid} fill to {old_fill}%", type="info")
             
     elif action == "add_bin":
         # payload is bin_id
         bid = payload
-        b = state.bins_map.get(bid)
-        if b:
-            state.bins.remove(b)
-            state.bins_map.remove(bid)
-            save_all()
+        if state.remove_bin(bid):
+            save_all("bins")
             show_popup(f"Undo: Removed bin {bid}", type="info")
-    refresh_ui()
 
-# Run the urgent collection sequence asynchronously
-async def run_urgent_collection_sequence(ordered_bins, client):
+# Interleave the trucks' stops so collections appear in parallel, truck by truck
+def _dispatch_order(solution):
+    per_truck = {}
+    for route in solution.routes:
+        per_truck.setdefault(route.truck, []).extend(route.stops)
+    order = []
+    queues = [list(stops) for _, stops in sorted(per_truck.items())]
+    trucks = sorted(per_truck)
+    while any(queues):
+        for truck, stops in zip(trucks, queues):
+            if stops:
+                order.append((truck, stops.pop(0)))
+    return order
+
+# Run the planned collection: every stop is emptied in one batch dispatch
+async def run_urgent_collection_sequence(stops, client):
     with client:
-        count = 0
-        for b in ordered_bins:
-            dispatch_bin_logic(b.id, silent=True, refresh=True)
-            count += 1
-            ui.notify(f"Priority Collection: Bin {b.id} emptied", type="positive")
-            await asyncio.sleep(2.5)
-            
-        show_popup(f"Priority Collection: Collected {count} bins based on priority.", type="positive")
+        records = dispatch_bins_batch([b.id for _, b in stops], source="priority")
+        per_truck = {}
+        for truck, _ in stops:
+            per_truck[truck] = per_truck.get(truck, 0) + 1
+        for truck, count in sorted(per_truck.items()):
+            ui.notify(f"Truck {truck}: {count} bins emptied", type="positive")
+        show_popup(f"Priority Collection: Collected {len(records)} bins on planned truck routes.", type="positive")
+
+# Plan truck routes (capacitated VRP) off the event loop and start dispatching them
+async def _plan_and_dispatch(candidates, client):
+    solution = await asyncio.to_thread(
+        vrp.solve_cvrp, (state.DEPOT_LAT, state.DEPOT_LON), candidates,
+        list(state.facilities), trucks=state.TRUCKS)
+    with client:
+        trips = len(solution.routes)
+        show_popup(f"Planned {trips} trips for {state.TRUCKS} trucks ({solution.distance:.1f} km)", type="info")
+        if solution.unassigned:
+            show_popup(f"{len(solution.unassigned)} bins exceed truck or facility capacity; left for the next run", type="warning")
+    await run_urgent_collection_sequence(_dispatch_order(solution), client)
 
-# Collect all urgent bins (>=80% full) using priority queue
+# Collect all urgent bins (>=80% full) on planned truck routes
 async def collect_urgent_action():
-    # 1. Identify Critical Bins (>= 80%)
-    # 2. Add to Priority Queue (Max-Heap based on fill level)
-    pq = PriorityQueue()
-    critical_bins = []
-    
-    for b in state.bins:
-        if b.fill_level >= 80:
-            pq.push(b)
-            critical_bins.append(b)
-            
-    if not critical_bins:
+    # Critical bins (>= 80%) straight from the long-lived urgency heap
+    candidates = state.urgency.items_at_least(80)
+
+    if not candidates:
         show_popup("No critical bins (>=80%) to collect", type="info")
         return
 
-    # 3. Pop from PQ to get collection order (highest fill first)
-    ordered_bins = []
-    while len(pq) > 0:
-        ordered_bins.append(pq.pop())
-        
-    
-    # 5. Dispatch in optimized order (Background Task)
-    # Capture client context
+    # Route and dispatch in the background; capture client context
     client = ui.context.client
-    asyncio.create_task(run_urgent_collection_sequence(ordered_bins, client))
+    asyncio.create_task(_plan_and_dispatch(candidates, client))
 
-# Collect all non-empty bins using priority queue
+# Collect all non-empty bins on planned truck routes
 async def collect_all_bins_action():
-    # 1. Add ALL bins to Priority Queue (Max-Heap based on fill level)
-    pq = PriorityQueue()
-    all_bins = []
-    
-    for b in state.bins:
-        if b.fill_level > 0: # Only collect non-empty bins
-            pq.push(b)
-            all_bins.append(b)
-            
-    if not all_bins:
+    # All non-empty bins from the urgency heap
+    candidates = state.urgency.items_at_least(1)
+
+    if not candidates:
         show_popup("No bins to collect", type="info")
         return
 
-    # 2. Pop from PQ to get collection order (highest fill first)
-    ordered_bins = []
-    while len(pq) > 0:
-        ordered_bins.append(pq.pop())
-        
-    # 3. Dispatch in optimized order (Background Task)
+    # Route and dispatch in the background
     client = ui.context.client
-    asyncio.create_task(run_urgent_collection_sequence(ordered_bins, client))
+    asyncio.create_task(_plan_and_dispatch(candidates, client))
 
 # Add a new bin to the system
 def add_bin_action(id, btype, lat, lon, fill):
@@ -254,13 +276,10 @@ def add_bin_action(id, btype, lat, lon, fill):
             return
 
         new_bin = models.Bin(id=str(id), waste_type=btype, lat=float(lat), lon=float(lon), fill_level=int(fill))
-        state.bins.append(new_bin)
-        state.bins_map.set(str(id), new_bin)
+        state.add_bin(new_bin)
         state.request_stack.append(("add_bin", str(id)))
-        save_all()
-        save_all()
+        save_all("bins")
         show_popup(f"Bin {id} added", type="positive")
-        refresh_ui()
     except Exception as e:
         show_popup(f"Error adding bin: {e}", type="negative")
 
@@ -271,10 +290,10 @@ def update_fill_action(bin_id, new_fill):
         show_popup("Bin not found", type="negative")
         return
     old_fill = b.fill_level
-    b.fill_level = int(new_fill)
+    state.set_fill_level(b, int(new_fill))
     
     # Log to history
-    state.history.append({
+    state.append_history({
         "bin_id": bin_id,
         "timestamp": models.get_iso_timestamp(),
         "status": "Updated",
@@ -284,10 +303,8 @@ def update_fill_action(bin_id, new_fill):
     })
     
     state.request_stack.append(("update_fill", (bin_id, old_fill)))
-    save_all()
-    save_all()
+    save_all("bins")
     show_popup(f"Updated {bin_id} to {new_fill}%", type="positive")
-    refresh_ui()
 
 # Simulate IoT sensor updates for all bins
 def simulate_updates_action():
@@ -298,7 +315,9 @@ def simulate_updates_action():
         old_fill = b.fill_level
         b.simulate_iot_update()
         if b.fill_level != old_fill:
-            state.history.append({
+            state.update_urgency(b)
+            events.publish(events.BIN_UPDATED, b)
+            state.append_history({
                 "bin_id": b.id,
                 "timestamp": models.get_iso_timestamp(),
                 "status": "IoT Update",
@@ -307,7 +326,6 @@ def simulate_updates_action():
                 "type": b.waste_type
             })
             updates_count += 1
-    save_all()
+    save_all("bins")
     print(f"Updates saved. {updates_count} bins updated. Showing popup.")
     show_popup(f"Simulated IoT updates for {updates_count} bins", type="info")
-    refresh_ui()
@@ -0,0 +1,240 @@
+import time
+from collections import namedtuple
+
+from geometry import haversine_km
+from structures.spatial_index import GridIndex
+
+BIN_VOLUME = 240        # litres held by a bin at 100% fill
+TRUCK_CAPACITY = 2000   # litres a truck carries per trip
+SAVINGS_NEIGHBOURS = 20  # merges are only considered between this many nearest bins
+
+# One trip: truck leaves the depot, empties stops in order, unloads at facility.
+# load in litres, distance in km (depot -> stops -> facility)
+TruckRoute = namedtuple("TruckRoute", ["truck", "stops", "facility", "load", "distance"])
+# routes: TruckRoute list in dispatch order; unassigned: bins that did not fit
+# any truck trip or facility intake this run
+VRPSolution = namedtuple("VRPSolution", ["routes", "unassigned", "distance", "stats"])
+_Point = namedtuple("_Point", ["lat", "lon"])
+
+
+def straight_line_km(a, b):
+    """Default distance between two objects with lat/lon: great-circle km."""
+    return haversine_km(a.lat, a.lon, b.lat, b.lon)
+
+
+def bin_load(b, bin_volume=BIN_VOLUME):
+    """Litres collected when emptying bin b."""
+    return b.fill_level / 100 * bin_volume
+
+
+def _trip_cost(depot, stops, facility, dist):
+    cost = dist(depot, stops[0]) + dist(stops[-1], facility)
+    for a, b in zip(stops, stops[1:]):
+        cost += dist(a, b)
+    return cost
+
+
+def _savings_trips(depot, bins, loads, capacity, dist):
+    """
+    Clarke-Wright savings: start with one trip per bin and repeatedly join
+    the two trip ends with the largest saving d(0,i) + d(0,j) - d(i,j),
+    as long as the joined load fits in a truck. Candidate pairs are limited
+    to near neighbours, so this stays O(n k log n).
+    """
+    n = len(bins)
+    index = GridIndex(GridIndex.suggest_cell_size((b.lat, b.lon) for b in bins))
+    for i, b in enumerate(bins):
+        index.insert(i, b.lat, b.lon)
+    from_depot = [dist(depot, b) for b in bins]
+    savings = []
+    for i, b in enumerate(bins):
+        for _, j in index.nearest(b.lat, b.lon, k=SAVINGS_NEIGHBOURS, exclude=i):
+            if i < j:
+                savings.append((from_depot[i] + from_depot[j] - dist(b, bins[j]), i, j))
+    savings.sort(reverse=True)
+
+    trips = {i: [i] for i in range(n)}      # trip id -> bin indexes
+    trip_of = list(range(n))
+    trip_load = {i: loads[i] for i in range(n)}
+    merges = 0
+    for saving, i, j in savings:
+        if saving <= 0:
+            break
+        a, b = trip_of[i], trip_of[j]
+        if a == b or trip_load[a] + trip_load[b] > capacity:
+            continue
+        ta, tb = trips[a], trips[b]
+        # i and j must both be trip ends; orient as ... i + j ...
+        if ta[-1] != i:
+            if ta[0] != i:
+                continue
+            ta.reverse()
+        if tb[0] != j:
+            if tb[-1] != j:
+                continue
+            tb.reverse()
+        ta.extend(tb)
+        for k in tb:
+            trip_of[k] = a
+        trip_load[a] += trip_load.pop(b)
+        del trips[b]
+        merges += 1
+    return list(trips.values()), merges
+
+
+def _two_opt_trip(depot, stops, facility, dist, deadline):
+    """
+    2-opt inside one trip (depot and facility stay fixed), until no move
+    helps or the deadline passes. Returns moves made.
+    """
+    seq = [depot] + stops + [facility]
+    moves = 0
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(1, len(seq) - 2):
+            if time.perf_counter() > deadline:
+                break
+            for j in range(i + 1, len(seq) - 1):
+                delta = (dist(seq[i - 1], seq[j]) + dist(seq[i], seq[j + 1])
+                         - dist(seq[i - 1], seq[i]) - dist(seq[j], seq[j + 1]))
+                if delta < -1e-9:
+                    seq[i:j + 1] = reversed(seq[i:j + 1])
+                    moves += 1
+                    improved = True
+    stops[:] = seq[1:-1]
+    return moves
+
+
+def _relocate(trips, depot, dist, capacity, intake, used, load_of, deadline):
+    """
+    Move single bins between trips while that shortens the total distance
+    and keeps both truck capacity and the receiving facility's intake.
+    trips: list of [stops, facility, load]. Returns moves made.
+    """
+    moves = 0
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for a in trips:
+            stops_a, fac_a, _ = a
+            if not stops_a:
+                continue
+            for pos_a, b in enumerate(stops_a):
+                load = load_of[id(b)]
+                prev = stops_a[pos_a - 1] if pos_a > 0 else depot
+                nxt = stops_a[pos_a + 1] if pos_a + 1 < len(stops_a) else fac_a
+                gain = dist(prev, b) + dist(b, nxt) - dist(prev, nxt)
+                best = None
+                for t in trips:
+                    stops_t, fac_t, load_t = t
+                    if t is a or not stops_t or load_t + load > capacity:
+                        continue
+                    if fac_t is not fac_a and used[fac_t.id] + load > intake[fac_t.id]:
+                        continue
+                    seq = [depot] + stops_t + [fac_t]
+                    for k in range(len(seq) - 1):
+                        cost = dist(seq[k], b) + dist(b, seq[k + 1]) - dist(seq[k], seq[k + 1])
+                        if cost < gain - 1e-9 and (best is None or cost < best[0]):
+                            best = (cost, t, k)
+                if best is None:
+                    continue
+                _, t, k = best
+                del stops_a[pos_a]
+                a[2] -= load
+                t[0].insert(k, b)
+                t[2] += load
+                used[fac_a.id] -= load
+                used[t[1].id] += load
+                moves += 1
+                improved = True
+                break
+            if time.perf_counter() > deadline:
+                break
+    return moves
+
+
+def solve_cvrp(depot, bins, facilities, trucks=3, truck_capacity=TRUCK_CAPACITY,
+               bin_volume=BIN_VOLUME, dist=straight_line_km, time_budget=1.0):
+    """
+    Capacitated vehicle routing for a set of bins.
+
+    depot: (lat, lon) where every trip starts. Each trip collects bins
+    until the truck is full (truck_capacity litres; a bin holds
+    fill_level% of bin_volume) and unloads at a facility, whose capacity
+    is the most it can take in over this run. Trips are built by savings,
+    each is sent to the closest facility that can still take its load,
+    and then improved by 2-opt within trips and moving bins between trips
+    until time_budget seconds are used. Trips are shared out over the
+    trucks (each truck may run several trips, longest first).
+    dist(a, b) takes two objects with lat/lon (default: straight-line km).
+
+    Returns a VRPSolution; bins that fit no trip or facility are returned
+    in unassigned for a later run.
+    """
+    started = time.perf_counter()
+    deadline = started + time_budget
+    depot = _Point(*depot)
+    bins = [b for b in bins if b.fill_level > 0]
+    stats = {"bins": len(bins), "trips": 0, "savings_merges": 0, "two_opt_moves": 0,
+             "relocations": 0, "initial_distance": 0.0, "elapsed": 0.0}
+    if not bins or not facilities:
+        stats["elapsed"] = time.perf_counter() - started
+        return VRPSolution([], bins, 0.0, stats)
+
+    loads = [bin_load(b, bin_volume) for b in bins]
+    load_of = {id(b): load for b, load in zip(bins, loads)}
+    unassigned = [b for b, load in zip(bins, loads) if load > truck_capacity]
+    fits = [i for i, load in enumerate(loads) if load <= truck_capacity]
+    groups, stats["savings_merges"] = _savings_trips(
+        depot, [bins[i] for i in fits], [loads[i] for i in fits], truck_capacity, dist)
+
+    # facility per trip: heaviest trips choose first, closest facility end
+    # (either direction) with intake left
+    intake = {f.id: f.capacity for f in facilities}
+    used = {f.id: 0.0 for f in facilities}
+    trips = []
+    for group in sorted(groups, key=lambda g: -sum(loads[fits[k]] for k in g)):
+        stops = [bins[fits[k]] for k in group]
+        load = sum(load_of[id(b)] for b in stops)
+        best = None
+        for f in facilities:
+            if used[f.id] + load > intake[f.id]:
+                continue
+            for seq in (stops, stops[::-1]):
+                cost = _trip_cost(depot, seq, f, dist)
+                if best is None or cost < best[0]:
+                    best = (cost, seq, f)
+        if best is None:
+            unassigned.extend(stops)
+            continue
+        _, seq, f = best
+        used[f.id] += load
+        trips.append([list(seq), f, load])
+    stats["initial_distance"] = sum(_trip_cost(depot, t[0], t[1], dist) for t in trips)
+
+    # local search
+    for t in trips:
+        stats["two_opt_moves"] += _two_opt_trip(depot, t[0], t[1], dist, deadline)
+    stats["relocations"] = _relocate(trips, depot, dist, truck_capacity, intake, used,
+                                     load_of, deadline)
+    if stats["relocations"]:
+        for t in trips:
+            if t[0]:
+                stats["two_opt_moves"] += _two_opt_trip(depot, t[0], t[1], dist, deadline)
+    trips = [t for t in trips if t[0]]
+
+    # share trips out over the trucks, longest first to the least busy truck
+    costed = sorted(((_trip_cost(depot, s, f, dist), s, f, load) for s, f, load in trips),
+                    key=lambda c: -c[0])
+    busy = [0.0] * max(1, trucks)
+    routes = []
+    for cost, stops, f, load in costed:
+        truck = min(range(len(busy)), key=busy.__getitem__)
+        busy[truck] += cost
+        routes.append(TruckRoute(truck + 1, stops, f, load, cost))
+    routes.sort(key=lambda r: r.truck)
+
+    stats["trips"] = len(routes)
+    stats["elapsed"] = time.perf_counter() - started
+    return VRPSolution(routes, unassigned, sum(r.distance for r in routes), stats)
@@ -0,0 +1,70 @@
+"""
+Contraction hierarchy vs plain Dijkstra on a synthetic city network.
+
+Reports preprocessing time, save/load time of the on-disk hierarchy, query
+latency against Graph.dijkstra, A* and CSRGraph.dijkstra, and how many
+paths match Graph.dijkstra exactly (they differ only between equal-length
+alternatives).
+
+Run from the repository root (100k nodes takes several minutes to
+preprocess in pure Python):
+    python -m benchmarks.bench_contraction [nodes] [queries]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_csr_graph import build_network
+from structures.contraction_hierarchy import ContractionHierarchy
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    graph, build_secs = timed(lambda: build_network(n))
+    print(f"nodes={n:,} directed edges={sum(len(v) for v in graph.adj.values()):,} "
+          f"(network built in {build_secs:.1f} s)")
+
+    ch, prep_secs = timed(lambda: ContractionHierarchy.build(graph))
+    print(f"Preprocessing: {prep_secs:8.1f} s  ({ch.shortcut_count:,} shortcuts)")
+
+    path = os.path.join(tempfile.mkdtemp(), "road_ch.json")
+    _, save_secs = timed(lambda: ch.save(path))
+    loaded, load_secs = timed(lambda: ContractionHierarchy.load(path, graph))
+    print(f"Save / load:   {save_secs:8.2f} s / {load_secs:.2f} s  "
+          f"({os.path.getsize(path) / 1e6:.1f} MB, signature ok: {loaded is not None})")
+
+    rng = random.Random(7)
+    ids = list(graph.adj)
+    pairs = [(rng.choice(ids), rng.choice(ids)) for _ in range(queries)]
+    csr = graph.freeze()
+
+    def per_query(fn):
+        results, secs = timed(lambda: [fn(s, t) for s, t in pairs])
+        return results, secs / queries * 1000
+
+    plain, plain_ms = per_query(graph.dijkstra)
+    astar, astar_ms = per_query(lambda s, t: graph.shortest_path(s, t, "astar").path)
+    _, csr_ms = per_query(csr.dijkstra)
+    fast, ch_ms = per_query(loaded.dijkstra)
+    settled = sum(loaded.query(s, t)[2] for s, t in pairs) / queries
+
+    print(f"Graph.dijkstra:    {plain_ms:8.2f} ms/query")
+    print(f"Graph A*:          {astar_ms:8.2f} ms/query")
+    print(f"CSRGraph.dijkstra: {csr_ms:8.2f} ms/query")
+    print(f"CH query:          {ch_ms:8.2f} ms/query  ({plain_ms / ch_ms:.0f}x, {settled:.0f} nodes settled)")
+    same = sum(1 for a, b in zip(plain, fast) if a == b)
+    print(f"identical paths: {same}/{queries}  (A* identical: {sum(1 for a, b in zip(plain, astar) if a == b)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Memory and query time: structures.graph.Graph vs its CSR snapshot.
+
+Builds a synthetic city network (random points around Dubai, each linked to
+its k nearest neighbours) and times the same Dijkstra, on the same random
+queries, over the dict adjacency lists and over the CSR snapshot that
+Graph.dijkstra searches.
+
+Run from the repository root:
+    python -m benchmarks.bench_csr_graph [nodes] [queries]
+"""
+import heapq
+import random
+import sys
+import time
+import tracemalloc
+
+from structures.graph import INF, Graph
+from structures.spatial_index import GridIndex
+
+K = 5
+
+
+def build_network(n, seed=42):
+    rng = random.Random(seed)
+    points = [(f"N{i}", 25.2048 + rng.uniform(-0.3, 0.3), 55.2708 + rng.uniform(-0.3, 0.3)) for i in range(n)]
+    index = GridIndex(GridIndex.suggest_cell_size((lat, lon) for _, lat, lon in points))
+    for node_id, lat, lon in points:
+        index.insert(node_id, lat, lon)
+    graph = Graph()
+    for node_id, lat, lon in points:
+        graph.add_node(node_id, lat, lon)
+    for node_id, lat, lon in points:
+        for dist, other in index.nearest(lat, lon, k=K, exclude=node_id):
+            graph.add_edge(node_id, other, dist * 111)
+    return graph
+
+
+def dict_dijkstra(graph, source, target):
+    """The same Dijkstra over the dict adjacency lists, for comparison; returns the distance."""
+    dist = {source: 0}
+    heap = [(0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u == target:
+            return d
+        if d > dist[u]:
+            continue
+        for v, w in graph.adj[u]:
+            alt = d + w
+            if alt < dist.get(v, INF):
+                dist[v] = alt
+                heapq.heappush(heap, (alt, v))
+    return INF
+
+
+def measure(fn):
+    tracemalloc.start()
+    result = fn()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    graph, graph_bytes = measure(lambda: build_network(n))
+    edges = sum(len(v) for v in graph.adj.values())
+    start = time.perf_counter()
+    csr, csr_bytes = measure(graph.freeze)
+    freeze_secs = time.perf_counter() - start
+
+    print(f"nodes={n:,} directed edges={edges:,}")
+    print(f"Graph (dict adjacency): {graph_bytes / 1e6:8.1f} MB")
+    print(f"CSRGraph (arrays):      {csr_bytes / 1e6:8.1f} MB  (arrays {csr.nbytes() / 1e6:.1f} MB, built in {freeze_secs:.2f} s)")
+
+    rng = random.Random(7)
+    ids = list(graph.adj)
+    pairs = [(rng.choice(ids), rng.choice(ids)) for _ in range(queries)]
+
+    start = time.perf_counter()
+    slow = [dict_dijkstra(graph, s, t) for s, t in pairs]
+    graph_secs = time.perf_counter() - start
+    start = time.perf_counter()
+    fast = [csr.search(s, t)[1] for s, t in pairs]
+    csr_secs = time.perf_counter() - start
+
+    same = sum(1 for a, b in zip(slow, fast) if a == b or abs(a - b) < 1e-9)
+    print(f"Dijkstra, dict adjacency: {graph_secs / queries * 1000:8.1f} ms/query")
+    print(f"Dijkstra, CSRGraph:       {csr_secs / queries * 1000:8.1f} ms/query  ({graph_secs / csr_secs:.1f}x)")
+    print(f"identical distances: {same}/{queries}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Lookup cost of structures.hash_map.HashMap vs dict as the bin registry grows.
+
+Run from the repository root:
+    python -m benchmarks.bench_hash_map
+"""
+import random
+import timeit
+
+from structures.hash_map import HashMap
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+LOOKUPS = 100_000
+
+
+def bench(size):
+    keys = [str(100 + i) for i in range(size)]
+    hm = HashMap()
+    d = {}
+    for k in keys:
+        hm.set(k, k)
+        d[k] = k
+    probes = [random.choice(keys) for _ in range(LOOKUPS)]
+
+    hm_get = hm.get
+    hm_secs = timeit.timeit(lambda: [hm_get(k) for k in probes], number=1)
+    d_get = d.get
+    d_secs = timeit.timeit(lambda: [d_get(k) for k in probes], number=1)
+    return hm_secs / LOOKUPS * 1e9, d_secs / LOOKUPS * 1e9, hm.capacity
+
+
+def main():
+    print(f"{'bins':>10} {'HashMap ns/get':>16} {'dict ns/get':>12} {'buckets':>10}")
+    for size in SIZES:
+        hm_ns, d_ns, capacity = bench(size)
+        print(f"{size:>10,} {hm_ns:>16.0f} {d_ns:>12.0f} {capacity:>10,}")
+
+
+if __name__ == "__main__":
+    main()
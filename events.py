@@ -0,0 +1,126 @@
+"""
+In-process publish/subscribe bus.
+
+State changes are published on a topic (BIN_UPDATED, HISTORY_APPENDED,
+...) and every open browser session subscribes with its own handler, so
+all sessions see a change, not only the one that made it.
+
+Events are coalesced per subscription: a burst of publishes (a batch
+dispatch touches hundreds of bins) is delivered as one call with the list
+of (topic, payload) events, at most once per FRAME seconds. Handlers bound
+to a NiceGUI client run inside that client's context and are dropped when
+the client disconnects.
+"""
+import asyncio
+import threading
+
+BIN_UPDATED = "bin.updated"            # payload: the bin whose fill changed
+BIN_ADDED = "bin.added"                # payload: the new bin
+BIN_REMOVED = "bin.removed"            # payload: the removed bin
+HISTORY_APPENDED = "history.appended"  # payload: the new record
+HISTORY_REMOVED = "history.removed"    # payload: the removed record
+REQUEST_ENQUEUED = "request.enqueued"  # payload: the new request
+REQUEST_REMOVED = "request.removed"    # payload: the processed/rejected request
+GRAPH_CHANGED = "graph.changed"        # payload: the road graph
+STATE_LOADED = "state.loaded"          # payload: name of the loaded phase
+
+FRAME = 0.05  # seconds a subscription collects events before delivery
+
+
+class Subscription:
+    def __init__(self, bus, topics, handler, client):
+        self.bus = bus
+        self.topics = frozenset(topics)
+        self.handler = handler
+        self.client = client
+        self.pending = []
+        self.scheduled = False
+        self.active = True
+
+    def cancel(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self, frame=FRAME):
+        self.frame = frame
+        self._subs = {}  # topic -> list of Subscription
+        self._lock = threading.Lock()
+        self._loop = None
+
+    def subscribe(self, topics, handler, client=None):
+        """
+        Call handler(events) with the coalesced [(topic, payload), ...]
+        published on any of topics. With a client, delivery runs in that
+        client's context and stops when it disconnects.
+        """
+        if isinstance(topics, str):
+            topics = [topics]
+        sub = Subscription(self, topics, handler, client)
+        with self._lock:
+            for topic in sub.topics:
+                self._subs.setdefault(topic, []).append(sub)
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        if client is not None:
+            # on_delete (newer NiceGUI) outlives brief reconnects; older
+            # versions only have on_disconnect
+            getattr(client, "on_delete", client.on_disconnect)(sub.cancel)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            sub.active = False
+            for topic in sub.topics:
+                subs = self._subs.get(topic)
+                if subs and sub in subs:
+                    subs.remove(sub)
+            sub.pending.clear()
+
+    def publish(self, topic, payload=None):
+        """Queue an event for every subscriber of topic. Safe from any thread."""
+        with self._lock:
+            due = []
+            for sub in self._subs.get(topic, ()):
+                sub.pending.append((topic, payload))
+                if not sub.scheduled:
+                    sub.scheduled = True
+                    due.append(sub)
+        for sub in due:
+            self._schedule(sub)
+
+    def _schedule(self, sub):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            self._deliver(sub)  # no event loop (scripts): deliver right away
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            loop.call_later(self.frame, self._deliver, sub)
+        else:
+            loop.call_soon_threadsafe(loop.call_later, self.frame, self._deliver, sub)
+
+    def _deliver(self, sub):
+        with self._lock:
+            events, sub.pending = sub.pending, []
+            sub.scheduled = False
+        if not sub.active or not events:
+            return
+        try:
+            if sub.client is None:
+                sub.handler(events)
+            else:
+                with sub.client:
+                    sub.handler(events)
+        except Exception as e:
+            print(f"Event handler for {sorted(sub.topics)} failed: {e}")
+
+
+bus = EventBus()
+publish = bus.publish
+subscribe = bus.subscribe
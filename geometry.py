@@ -0,0 +1,66 @@
+"""
+Great-circle (haversine) distances in kilometres.
+
+Bulk kernels use NumPy when it is installed, turning a Python loop over
+points into a few array operations; without NumPy they fall back to plain
+Python with the same results (as lists instead of arrays).
+"""
+from math import asin, cos, radians, sin, sqrt
+
+try:
+    import numpy as np
+except ImportError:  # optional: pure-Python fallback below
+    np = None
+
+EARTH_RADIUS_KM = 6371.0088
+MATRIX_BLOCK = 1024  # rows per block in haversine_matrix (bounds temporary memory)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distance between two points in km."""
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a)))
+
+
+def haversine_pairs(lats1, lons1, lats2, lons2):
+    """Element-wise distances between (lats1[i], lons1[i]) and (lats2[i], lons2[i])."""
+    if np is None:
+        return [haversine_km(a, b, c, d) for a, b, c, d in zip(lats1, lons1, lats2, lons2)]
+    lat1 = np.radians(np.asarray(lats1, dtype=float))
+    lon1 = np.radians(np.asarray(lons1, dtype=float))
+    lat2 = np.radians(np.asarray(lats2, dtype=float))
+    lon2 = np.radians(np.asarray(lons2, dtype=float))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def haversine_to_many(lat, lon, lats, lons):
+    """Distances from one point to every (lats[i], lons[i])."""
+    if np is None:
+        return [haversine_km(lat, lon, b, c) for b, c in zip(lats, lons)]
+    lats = np.asarray(lats, dtype=float)
+    return haversine_pairs(np.full(lats.shape, lat), np.full(lats.shape, lon), lats, lons)
+
+
+def haversine_matrix(lats1, lons1, lats2, lons2, block=MATRIX_BLOCK):
+    """
+    Distances from every point of the first set to every point of the
+    second: an len1 x len2 array (list of rows without NumPy), computed
+    block rows at a time.
+    """
+    if np is None:
+        return [haversine_to_many(a, b, lats2, lons2) for a, b in zip(lats1, lons1)]
+    lat1 = np.radians(np.asarray(lats1, dtype=float))[:, None]
+    lon1 = np.radians(np.asarray(lons1, dtype=float))[:, None]
+    lat2 = np.radians(np.asarray(lats2, dtype=float))[None, :]
+    lon2 = np.radians(np.asarray(lons2, dtype=float))[None, :]
+    cos2 = np.cos(lat2)
+    out = np.empty((lat1.shape[0], lat2.shape[1]))
+    for start in range(0, lat1.shape[0], block):
+        rows = slice(start, start + block)
+        a = (np.sin((lat2 - lat1[rows]) / 2) ** 2
+             + np.cos(lat1[rows]) * cos2 * np.sin((lon2 - lon1[rows]) / 2) ** 2)
+        out[rows] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    return out
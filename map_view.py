@@ -1,5 +1,6 @@
 # Map visualization with Dijkstra's algorithm
 import plotly.graph_objects as go
+import state
 
 def render_map_view():
     """Render interactive map showing bins, facilities, and shortest paths using Dijkstra."""
@@ -53,12 +54,9 @@ def render_map_view():
             if selected_bin.value != "None":
                 bin_obj = next((b for b in bins if b.id == selected_bin.value), None)
                 if bin_obj:
-                    # Find nearest facility
-                    nearest_facility = min(facilities,
-                                          key=lambda f: routing.calculate_distance(bin_obj.lat, bin_obj.lon, f.lat, f.lon))
-                    
-                    # Calculate shortest path using Dijkstra
-                    path = road_graph.dijkstra(bin_obj.id, nearest_facility.id)
+                    # Nearest facility by road: walk the cached shortest-path tree
+                    route = state.route_to_nearest_facility(bin_obj.id)
+                    path = route.path
                     
                     if path and len(path) > 1:
                         # Get coordinates for path
@@ -80,13 +78,7 @@ def render_map_view():
                             hovertemplate='Path segment<extra></extra>'
                         ))
                         
-                        # Calculate total distance
-                        total_dist = 0
-                        for i in range(len(path) - 1):
-                            for neighbor, weight in road_graph.adj[path[i]]:
-                                if neighbor == path[i+1]:
-                                    total_dist += weight
-                                    break
+                        total_dist = route.distance
                         
                         # Show path info
                         with ui.card().classes("p-4 mb-4 bg-blue-50"):
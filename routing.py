@@ -1,6 +1,18 @@
+import hashlib
 import heapq
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from math import sqrt
 
+import geometry
+import storage
+from structures.distance_matrix import DistanceMatrix
+from structures.spatial_index import GridIndex
+
+INF = float('inf')
+
 def calculate_distance(lat1, lon1, lat2, lon2):
     # Simple Euclidean distance approximation for small areas
     return sqrt((lat1 - lat2)**2 + (lon1 - lon2)**2)
@@ -8,21 +20,276 @@ def calculate_distance(lat1, lon1, lat2, lon2):
 
 def optimize_route(start_lat, start_lon, bins):
     """
-    Simple Nearest Neighbor algorithm for route optimization.
+    Route from the start through every bin (nearest neighbour + local search).
     Returns a list of (lat, lon) tuples representing the path.
     """
+    return plan_route(start_lat, start_lon, bins).path
+
+
+# ---------- Route planning ----------
+CANDIDATE_NEIGHBOURS = 10  # local search only tries moves towards this many nearest stops
+
+# path: [(lat, lon)] from the start; order: bins in visiting order;
+# length / initial_length: km after / before local search
+RoutePlan = namedtuple("RoutePlan", ["path", "order", "length", "initial_length",
+                                     "improvement", "two_opt_moves", "or_opt_moves",
+                                     "elapsed", "metric"])
+
+
+def _nearest_neighbour_order(start_lat, start_lon, bins):
+    """Greedy tour built on a GridIndex: O(n log n)-ish instead of O(n^2)."""
+    index = GridIndex(GridIndex.suggest_cell_size((b.lat, b.lon) for b in bins))
+    for i, b in enumerate(bins):
+        index.insert(i, b.lat, b.lon)
+    order = []
+    lat, lon = start_lat, start_lon
+    while len(index):
+        _, i = index.nearest(lat, lon, k=1)[0]
+        index.remove(i)
+        order.append(i)
+        lat, lon = bins[i].lat, bins[i].lon
+    return order
+
+
+def _road_distances(start_lat, start_lon, bins, graph):
+    """Distance function over 0 = start, 1..n = bins using road distances."""
+    if graph is None:
+        import state
+        graph = state.get_road_graph()
+    # snap the start to the closest network node
+    node_ids = list(graph.positions)
+    coords = list(graph.positions.values())
+    to_start = geometry.haversine_to_many(start_lat, start_lon, [c[0] for c in coords], [c[1] for c in coords])
+    k = min(range(len(node_ids)), key=to_start.__getitem__)
+    start_node, snap = node_ids[k], float(to_start[k])
+    nodes = [start_node] + [b.id for b in bins]
+    matrix = distance_matrix(nodes, nodes, graph=graph)
+    coords = [(start_lat, start_lon)] + [(b.lat, b.lon) for b in bins]
+    size = len(nodes)
+    values = matrix.values
+
+    def dist(i, j):
+        d = values[i * size + j]
+        if d == INF:
+            # not connected by road: fall back to the straight line
+            d = geometry.haversine_km(*coords[i], *coords[j])
+        elif i == 0 or j == 0:
+            d += snap
+        return d
+    return dist
+
+
+def _tour_length(tour, dist):
+    return sum(dist(a, b) for a, b in zip(tour, tour[1:]))
+
+
+def _candidate_neighbours(coords, k):
+    """For each point, its k nearest points by straight line (move candidates)."""
+    index = GridIndex(GridIndex.suggest_cell_size(coords))
+    for i, (lat, lon) in enumerate(coords):
+        index.insert(i, lat, lon)
+    return [[j for _, j in index.nearest(lat, lon, k=k, exclude=i)]
+            for i, (lat, lon) in enumerate(coords)]
+
+
+def _two_opt(tour, pos, dist, neighbours, deadline):
+    """
+    One pass of 2-opt over the open tour (tour[0] is the fixed start):
+    reverse tour[i..j] whenever that shortens it, trying only segment ends
+    that are near neighbours. Returns moves made.
+    """
+    moves = 0
+    n = len(tour)
+    for i in range(1, n - 1):
+        if time.perf_counter() > deadline:
+            break
+        a, b = tour[i - 1], tour[i]
+        for c in neighbours[a]:
+            j = pos[c]
+            if j <= i:
+                continue
+            e = tour[j + 1] if j + 1 < n else None
+            before = dist(a, b) + (dist(c, e) if e is not None else 0)
+            after = dist(a, c) + (dist(b, e) if e is not None else 0)
+            if after < before - 1e-9:
+                tour[i:j + 1] = reversed(tour[i:j + 1])
+                for k in range(i, j + 1):
+                    pos[tour[k]] = k
+                moves += 1
+                break
+    return moves
+
+
+def _or_opt(tour, pos, dist, neighbours, deadline, max_segment=3):
+    """
+    One pass of Or-opt: move a run of 1..max_segment stops (either way
+    round) next to a near neighbour of one of its ends, if that shortens
+    the tour. Returns moves made.
+    """
+    moves = 0
+    for seg_len in range(1, max_segment + 1):
+        i = 1
+        while i + seg_len <= len(tour):
+            if time.perf_counter() > deadline:
+                return moves
+            n = len(tour)
+            first, last = tour[i], tour[i + seg_len - 1]
+            prev = tour[i - 1]
+            nxt = tour[i + seg_len] if i + seg_len < n else None
+            removed = dist(prev, first) + (dist(last, nxt) - dist(prev, nxt) if nxt is not None else 0)
+            best, best_pos, best_rev = 1e-9, None, False
+            # insert after tour[k]: right after or right before a neighbour
+            spots = {pos[c] + d for c in neighbours[first] + neighbours[last] for d in (0, -1)}
+            for k in spots:
+                if k < 0 or i - 1 <= k < i + seg_len:
+                    continue  # insertion point inside / next to the segment
+                p = tour[k]
+                q = tour[k + 1] if k + 1 < n else None
+                joined = dist(p, q) if q is not None else 0
+                for rev in (False, True):
+                    head, tail = (last, first) if rev else (first, last)
+                    added = dist(p, head) + (dist(tail, q) - joined if q is not None else 0)
+                    if removed - added > best:
+                        best, best_pos, best_rev = removed - added, k, rev
+            if best_pos is None:
+                i += 1
+                continue
+            segment = tour[i:i + seg_len]
+            if best_rev:
+                segment.reverse()
+            del tour[i:i + seg_len]
+            k = best_pos if best_pos < i else best_pos - seg_len
+            tour[k + 1:k + 1] = segment
+            for m in range(min(i, k + 1), max(i + seg_len, k + 1 + seg_len)):
+                pos[tour[m]] = m
+            moves += 1
+    return moves
+
+
+def plan_route(start_lat, start_lon, bins, time_budget=1.0, use_roads=False, graph=None):
+    """
+    Plan a route from the start through every bin.
+
+    Builds a nearest-neighbour tour on a spatial index, then improves it
+    with 2-opt and Or-opt passes until no move helps or time_budget seconds
+    are used up. Distances are straight-line km by default, or road km on
+    graph (default: state's road network) when use_roads is set.
+    Returns a RoutePlan.
+    """
+    started = time.perf_counter()
+    bins = list(bins)
     if not bins:
-        return []
-
-    path = [(start_lat, start_lon)]
-    unvisited = bins.copy()
-    current_lat, current_lon = start_lat, start_lon
-
-    while unvisited:
-        # Find nearest bin
-        nearest = min(unvisited, key=lambda b: calculate_distance(current_lat, current_lon, b.lat, b.lon))
-        path.append((nearest.lat, nearest.lon))
-        current_lat, current_lon = nearest.lat, nearest.lon
-        unvisited.remove(nearest)
-    
-    return path
+        return RoutePlan([], [], 0.0, 0.0, 0.0, 0, 0, 0.0, "road" if use_roads else "straight-line")
+
+    if use_roads:
+        dist = _road_distances(start_lat, start_lon, bins, graph)
+    else:
+        coords = [(start_lat, start_lon)] + [(b.lat, b.lon) for b in bins]
+
+        def dist(i, j):
+            return geometry.haversine_km(*coords[i], *coords[j])
+
+    # tour holds 0 (the start) followed by 1-based bin positions
+    tour = [0] + [i + 1 for i in _nearest_neighbour_order(start_lat, start_lon, bins)]
+    initial = _tour_length(tour, dist)
+
+    neighbours = _candidate_neighbours([(start_lat, start_lon)] + [(b.lat, b.lon) for b in bins],
+                                       CANDIDATE_NEIGHBOURS)
+    pos = [0] * len(tour)
+    for k, stop in enumerate(tour):
+        pos[stop] = k
+
+    deadline = started + time_budget
+    two_opt_moves = or_opt_moves = 0
+    while time.perf_counter() < deadline:
+        made = _two_opt(tour, pos, dist, neighbours, deadline)
+        two_opt_moves += made
+        moved = _or_opt(tour, pos, dist, neighbours, deadline)
+        or_opt_moves += moved
+        if not made and not moved:
+            break
+
+    length = _tour_length(tour, dist)
+    order = [bins[i - 1] for i in tour[1:]]
+    path = [(start_lat, start_lon)] + [(b.lat, b.lon) for b in order]
+    improvement = (initial - length) / initial if initial else 0.0
+    return RoutePlan(path, order, length, initial, improvement, two_opt_moves, or_opt_moves,
+                     time.perf_counter() - started, "road" if use_roads else "straight-line")
+
+
+# ---------- Distance matrices ----------
+MATRIX_CACHE_DIR = os.path.join(storage.DATA_DIR, "matrix_cache")
+PARALLEL_MIN_SOURCES = 64  # below this a process pool costs more than it saves
+MATRIX_CHUNK = 32          # sources per task sent to a worker
+
+_worker_graph = None
+
+
+def _init_worker(csr):
+    # runs once per worker process: keep the read-only snapshot around
+    global _worker_graph
+    _worker_graph = csr
+
+
+def _matrix_rows(sources, targets):
+    return [_worker_graph.one_to_many(s, targets) for s in sources]
+
+
+def _matrix_key(graph, sources, targets):
+    h = hashlib.sha1(graph.signature().encode("utf-8"))
+    h.update(repr((list(sources), list(targets))).encode("utf-8"))
+    return h.hexdigest()
+
+
+def distance_matrix(sources, targets, graph=None, workers=None, cache_dir=MATRIX_CACHE_DIR):
+    """
+    Road distances from every node in sources to every node in targets, as a
+    float32 DistanceMatrix (inf where unreachable).
+
+    Runs one one-to-many search per source over the graph's CSR snapshot.
+    Large jobs are spread over a ProcessPoolExecutor; each worker receives
+    the snapshot once, through its initializer. Results are cached in
+    cache_dir under a key of the graph signature plus the source and target
+    lists (cache_dir=None disables the cache). graph defaults to the road
+    network in state.
+    """
+    if graph is None:
+        import state
+        graph = state.get_road_graph()
+    sources = list(sources)
+    targets = list(targets)
+
+    path = None
+    if cache_dir:
+        path = os.path.join(cache_dir, _matrix_key(graph, sources, targets) + ".f32")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                try:
+                    return DistanceMatrix.from_bytes(sources, targets, f.read())
+                except ValueError:
+                    pass  # truncated / foreign file: recompute
+
+    csr = graph.freeze()
+    matrix = DistanceMatrix(sources, targets)
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(sources) >= PARALLEL_MIN_SOURCES:
+        chunks = [sources[i:i + MATRIX_CHUNK] for i in range(0, len(sources), MATRIX_CHUNK)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(csr,)) as pool:
+            futures = [pool.submit(_matrix_rows, chunk, targets) for chunk in chunks]
+            i = 0
+            for future in futures:
+                for distances in future.result():
+                    matrix.set_row(i, distances)
+                    i += 1
+    else:
+        for i, s in enumerate(sources):
+            matrix.set_row(i, csr.one_to_many(s, targets))
+
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(matrix.to_bytes())
+        os.replace(tmp, path)
+    return matrix
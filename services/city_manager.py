@@ -1,12 +1,15 @@
 from structures.linked_list import LinkedList
-from structures.priority_queue import PriorityQueue
+from structures.priority_queue import IndexedPriorityQueue
 from structures.hash_map import HashMap
 from structures.avl_tree import AVLTree
 from structures.graph import Graph
+from structures.route_cache import RouteCache
+from structures.spatial_index import GridIndex
 from structures.queue import Queue
 from structures.stack import Stack
 from algorithms.sorting import merge_sort
 from models import get_iso_timestamp
+from geometry import haversine_pairs
 
 
 class CityManager:
@@ -22,10 +25,10 @@ class CityManager:
         for f in facilities:
             self.facilities.insert(f.id, f)
             
-        # urgent heap
-        self.urgent = PriorityQueue()
+        # urgent heap (keyed by bin id so fill changes are O(log n))
+        self.urgent = IndexedPriorityQueue()
         for b in bins:
-            self.urgent.push(b)
+            self.urgent.push(b.id, b.fill_level, b)
             
         # hash map for fast lookup
         self.bin_map = HashMap()
@@ -40,7 +43,9 @@ class CityManager:
             self.graph.add_node(f.id, f.lat, f.lon)
 
         # create edges between nearby nodes (k-nearest or radius)
-        self._connect_nodes(radius_km=0.05)
+        self.radius_km = 0.05
+        self._connect_nodes(radius_km=self.radius_km)
+        self.route_cache = RouteCache()
         # queue & stack
         self.requests = Queue()
         self.undo_stack = Stack()
@@ -49,17 +54,27 @@ class CityManager:
 
     def _connect_nodes(self, radius_km=0.05):
         nodes = list(self.graph.positions.items())  # (node_id, (lat,lon))
-        for i in range(len(nodes)):
-            id_i, pos_i = nodes[i]
-            for j in range(i+1, len(nodes)):
-                id_j, pos_j = nodes[j]
-                # simple euclidean distance in degrees
-                dx = pos_i[0] - pos_j[0]
-                dy = pos_i[1] - pos_j[1]
-                dist = (dx*dx + dy*dy)**0.5
-                if dist <= radius_km:
-                    # rough conversion deg->km
-                    self.graph.add_edge(id_i, id_j, weight=dist*111)
+        order = {node_id: i for i, (node_id, _) in enumerate(nodes)}
+        # grid cells of one radius: each query only touches the 3x3 block around it
+        index = GridIndex(cell_size=radius_km)
+        for node_id, (lat, lon) in nodes:
+            index.insert(node_id, lat, lon)
+        self.node_index = index
+        pairs = []
+        for id_i, (lat, lon) in nodes:
+            # neighbours found by euclidean distance in degrees
+            for dist, id_j in index.within(lat, lon, radius_km):
+                if order[id_j] > order[id_i]:
+                    pairs.append((id_i, id_j))
+        self._add_edges(pairs)
+
+    def _add_edges(self, pairs):
+        # weights are great-circle km, computed for all pairs at once
+        pos = self.graph.positions
+        km = haversine_pairs([pos[a][0] for a, _ in pairs], [pos[a][1] for a, _ in pairs],
+                             [pos[b][0] for _, b in pairs], [pos[b][1] for _, b in pairs])
+        for (a, b), w in zip(pairs, km):
+            self.graph.add_edge(a, b, weight=float(w))
 
     def get_all_bins(self):
         return self.bins_list.to_list()
@@ -68,17 +83,16 @@ class CityManager:
         return self.bin_map.get(bin_id)
 
     def update_iot(self):
-        # simulate updates and rebuild urgent heap
+        # simulate updates and re-key changed bins in the urgent heap
         for b in self.bins_list:
+            old_fill = b.fill_level
             b.simulate_iot_update()
-        # rebuild heap
-        self.urgent = PriorityQueue()
-        for b in self.bins_list:
-            self.urgent.push(b)
+            if b.fill_level != old_fill:
+                self.urgent.update(b.id, b.fill_level)
 
     def get_urgent_bins(self, threshold=80):
         # Return bins with fill level >= threshold, sorted by fill level (desc)
-        return sorted([b for b in self.bins_list if b.fill_level >= threshold], key=lambda x: x.fill_level, reverse=True)
+        return self.urgent.items_at_least(threshold)
 
     def sorted_facilities(self):
         # return facilities sorted by capacity ascending
@@ -89,15 +103,20 @@ class CityManager:
         self.bins_list.add(bin_obj)
         self.bin_map.set(bin_obj.id, bin_obj)
         self.graph.add_node(bin_obj.id, bin_obj.lat, bin_obj.lon)
-        self.urgent.push(bin_obj)
+        self.node_index.insert(bin_obj.id, bin_obj.lat, bin_obj.lon)
+        self._add_edges([(bin_obj.id, other_id) for _, other_id in
+                         self.node_index.within(bin_obj.lat, bin_obj.lon, self.radius_km)
+                         if other_id != bin_obj.id])
+        self.urgent.push(bin_obj.id, bin_obj.fill_level, bin_obj)
         self.undo_stack.push(("add_bin", bin_obj.id))
 
     def remove_bin(self, bin_id):
         # Remove from list and map
         if self.bins_list.remove(bin_id):
             self.bin_map.remove(bin_id)
-            # Rebuild urgent heap (expensive but safe)
-            self.update_iot()
+            self.graph.remove_node(bin_id)
+            self.node_index.remove(bin_id)
+            self.urgent.remove(bin_id)
             return True
         return False
 
@@ -132,9 +151,9 @@ class CityManager:
                 
         return None, None
 
-    def find_route(self, start_id, target_id):
-        # uses graph.dijkstra to get list of node ids
-        path = self.graph.dijkstra(start_id, target_id)
+    def find_route(self, start_id, target_id, method="dijkstra"):
+        # method: "dijkstra", "astar" or "bidirectional" (see Graph.shortest_path)
+        path = self.route_cache.get(self.graph, start_id, target_id, method).path
         # convert to coordinates
         coords = [self.graph.get_node_pos(nid) for nid in path]
         return path, coords
@@ -1,18 +1,23 @@
 # services/predictor.py
 from structures.min_heap import MinHeap
 import datetime
+import storage
 
 class OverflowPredictor:
     def __init__(self):
         pass
 
-    def predict(self, bins, history):
+    def predict(self, bins, history=None):
         """
         Predicts when bins will overflow based on historical fill rates.
         Uses actual historical data to calculate fill rates per bin.
+        If history is not given, only the events for these bins are fetched
+        from storage (via the bin_id index).
         Returns a list of (hours_remaining, bin) tuples, sorted by urgency (soonest first).
         """
         heap = MinHeap()
+        if history is None:
+            history = storage.query_history(bin_id=[b.id for b in bins])
         
         # Group history by bin_id and sort by timestamp
         bin_history = {}
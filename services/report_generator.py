@@ -3,6 +3,7 @@ import datetime
 import os
 import tempfile
 from typing import List, Dict
+import storage
 
 class GreenBinReport(FPDF):
     """Simplified Professional PDF Report Generator"""
@@ -56,13 +57,13 @@ class GreenBinReport(FPDF):
         self.cell(width, 5, label, 0, 0, 'C')
         self.set_text_color(0, 0, 0)
 
-def calculate_metrics(bins: List, history: List, facilities: List) -> Dict:
+def calculate_metrics(bins: List, facilities: List) -> Dict:
     """Calculate key metrics"""
-    total_collections = len([h for h in history if h.get('status') == 'Collected'])
+    total_collections = storage.count_history(status='Collected')
     co2_saved = total_collections * 2.5
     
-    request_collections = len([h for h in history if h.get('source') == 'request'])
-    total_requests = request_collections + len([h for h in history if h.get('status') == 'Collected'])
+    request_collections = storage.count_history(source='request')
+    total_requests = request_collections + total_collections
     efficiency = (total_collections / total_requests * 100) if total_requests > 0 else 100.0
     
     return {
@@ -71,12 +72,12 @@ def calculate_metrics(bins: List, history: List, facilities: List) -> Dict:
         'efficiency': efficiency,
         'co2_saved': co2_saved,
         'critical_bins': len([b for b in bins if b.fill_level >= 80]),
-        'recycling_rate': (len([h for h in history if h.get('type') == 'Recyclable']) / total_collections * 100) if total_collections > 0 else 0.0
+        'recycling_rate': (storage.count_history(waste_type='Recyclable') / total_collections * 100) if total_collections > 0 else 0.0
     }
 
-def generate_professional_report(bins: List, history: List, facilities: List) -> str:
+def generate_professional_report(bins: List, facilities: List) -> str:
     """Generate a simplified one-page professional report"""
-    metrics = calculate_metrics(bins, history, facilities)
+    metrics = calculate_metrics(bins, facilities)
     
     pdf = GreenBinReport()
     pdf.alias_nb_pages()
@@ -114,7 +115,7 @@ def generate_professional_report(bins: List, history: List, facilities: List) ->
     pdf.cell(50, 7, 'Time', 1, 1)
     
     pdf.set_font('Arial', '', 9)
-    recent = [h for h in history if h.get('status') == 'Collected'][-5:]
+    recent = storage.query_history(status='Collected', descending=True, limit=5)[::-1]
     if not recent:
         pdf.cell(0, 7, 'No recent activity', 1, 1, 'C')
     else:
@@ -1,33 +1,115 @@
+import atexit
+import os
 import random
+import threading
+import time
 from collections import deque
+from datetime import datetime
+import events
+import geometry
 import models
 from models.facility import Facility
 import storage
-import routing
 from structures.avl_tree import AVLTree
-from structures.graph import Graph
+from structures.contraction_hierarchy import ContractionHierarchy
+from structures.graph import BUCKET_MINUTES, Graph
 from structures.hash_map import HashMap
+from structures.history_index import HistoryIndex
+from structures.priority_queue import IndexedPriorityQueue
 from structures.linked_list import LinkedList
+from structures.route_cache import RouteCache
+from structures.sorted_index import SortedIndex
+from structures.spatial_index import GridIndex
 
 # ---------- State & Data ----------
-bins = storage.load_bins()
-requests = storage.load_requests()
-history = storage.load_history()
-facilities = storage.load_facilities()
+# Containers exist from import time but are filled lazily (see load_core /
+# load_history), so importing this module never touches the disk. They are
+# filled in place, so references taken early stay valid.
+bins = []
+requests = []
+history = []
+facilities = []
 request_stack = deque()
 
 # HashMap for fast Bin Lookup (Key: Bin ID)
 bins_map = HashMap()
-for b in bins:
-    bins_map.set(b.id, b)
 
 # AVL Tree for Facility Lookup (Key: Facility ID)
 facilities_avl = AVLTree()
-for f in facilities:
-    facilities_avl.insert(f.id, f)
 
-# seed sample bins if empty (keeps previous logic)
-if not bins:
+# AVL Tree ordered by efficiency (Key: (efficiency, Facility ID)) for
+# efficiency bands and sorted paging
+facilities_by_efficiency = AVLTree()
+
+# Long-lived urgency heap (Key: Bin ID, priority: fill level). Kept current
+# via update_urgency whenever a fill level changes.
+urgency = IndexedPriorityQueue()
+
+# Precomputed bin orders for the paged registry table (see query_bins); the
+# fill order is re-keyed together with the urgency heap
+BIN_SORT_KEYS = {
+    "id": lambda b: b.id,
+    "type": lambda b: b.waste_type,
+    "fill": lambda b: b.fill_level,
+    "location": lambda b: (b.lat, b.lon),
+}
+bin_order = {name: SortedIndex(key) for name, key in BIN_SORT_KEYS.items()}
+
+# Posting lists over history (status, type, bin ID, area) for the paged
+# history view; built once history is loaded, then kept current on append
+history_index = HistoryIndex()
+
+# Road network graph for Dijkstra's algorithm (built on first use), plus
+# the spatial indexes used to wire it up
+road_graph = None
+node_index = None
+facility_index = None
+ROAD_NEIGHBOURS = 3  # each node is linked to this many nearest nodes
+
+# Typical city speeds (km/h) by weekday and hour, used as the road network's
+# default speed profile for travel-time routing. Weekend is Saturday/Sunday.
+def _city_speed(weekday, hour):
+    if hour < 5 or hour >= 22:
+        return 60.0
+    if weekday < 5 and (7 <= hour < 9.5):
+        return 22.0   # morning rush
+    if weekday < 5 and (16.5 <= hour < 19.5):
+        return 20.0   # evening rush
+    return 45.0 if weekday < 5 else 50.0
+
+CITY_SPEED_PROFILE = [_city_speed(day, bucket * BUCKET_MINUTES / 60)
+                      for day in range(7) for bucket in range(24 * 60 // BUCKET_MINUTES)]
+
+# Point-to-point routes on road_graph, shared by every client session
+route_cache = RouteCache()
+
+# Optional contraction hierarchy of road_graph (see get_contraction_hierarchy)
+ROAD_CH_FILE = os.path.join(storage.DATA_DIR, "road_ch.json")
+road_ch = None
+
+# Depot every collection truck starts from
+DEPOT_LAT = 25.2048
+DEPOT_LON = 55.2708
+TRUCKS = 3  # collection trucks available for a dispatch run
+
+# Readiness flags and per-phase load timings (seconds)
+ready = {"core": False, "history": False, "road_graph": False}
+history_loaded = 0
+timings = {}
+_core_lock = threading.RLock()
+_history_lock = threading.Lock()
+_graph_lock = threading.Lock()
+
+
+def _timed(phase, fn):
+    start = time.perf_counter()
+    result = fn()
+    timings[phase] = time.perf_counter() - start
+    return result
+
+
+def _seed_bins():
+    # seed sample bins if empty (keeps previous logic)
     for i in range(1, 21):
         b_id = f"{100 + i}"
         b_type = random.choice(["Household", "Industrial", "Recyclable", "Organic"])
@@ -37,10 +119,14 @@ if not bins:
         new_bin = models.Bin(id=b_id, waste_type=b_type, lat=b_lat, lon=b_lon, fill_level=b_fill)
         bins.append(new_bin)
         bins_map.set(b_id, new_bin)
+        for order in bin_order.values():
+            order.add(b_id, new_bin)
+        update_urgency(new_bin)
     storage.save_bins(bins)
 
-# seed facilities if empty
-if not facilities:
+
+def _seed_facilities():
+    # seed facilities if empty
     for i in range(1, 6):
         f_id = f"F{100 + i}"
         f_lat = 25.2048 + random.uniform(-0.02, 0.02)
@@ -50,15 +136,104 @@ if not facilities:
         new_f = Facility(id=f_id, lat=f_lat, lon=f_lon, capacity=f_cap, efficiency=f_eff)
         facilities.append(new_f)
         facilities_avl.insert(new_f.id, new_f)
+        facilities_by_efficiency.insert((new_f.efficiency, new_f.id), new_f)
     storage.save_facilities(facilities)
 
-# Build road network graph for Dijkstra's algorithm
-road_graph = Graph()
+
+def _build_indexes():
+    for b in bins:
+        bins_map.set(b.id, b)
+        urgency.update(b.id, b.fill_level, b)
+    for order in bin_order.values():
+        order.bulk_load((b.id, b) for b in bins)
+    by_id = {f.id: f for f in facilities}
+    facilities_avl.bulk_load(sorted(by_id.items()))
+    facilities_by_efficiency.bulk_load(sorted(((f.efficiency, f.id), f) for f in by_id.values()))
+
+
+def load_core():
+    """Load bins, requests and facilities and build their indexes (idempotent)."""
+    with _core_lock:
+        if ready["core"]:
+            return
+        bins.extend(_timed("bins", storage.load_bins))
+        requests.extend(_timed("requests", storage.load_requests))
+        facilities.extend(_timed("facilities", storage.load_facilities))
+        _timed("indexes", _build_indexes)
+        if not bins:
+            _timed("seed_bins", _seed_bins)
+        if not facilities:
+            _timed("seed_facilities", _seed_facilities)
+        ready["core"] = True
+    events.publish(events.STATE_LOADED, "core")
+
+
+def load_history(batch_size=5000):
+    """Stream stored history into `history` in batches (idempotent)."""
+    global history_loaded
+    with _history_lock:
+        if ready["history"]:
+            return
+        start = time.perf_counter()
+        stream = storage.stream_history(history, batch_size)
+        # Fix where the stored history ends while no event is half-recorded
+        # (in the list but not yet in storage)
+        with _flush_lock:
+            next(stream)
+        for history_loaded in stream:
+            pass
+        timings["history"] = time.perf_counter() - start
+        _timed("history_index", lambda: history_index.rebuild(history))
+        ready["history"] = True
+    events.publish(events.STATE_LOADED, "history")
+
+
+def load_all():
+    """Load everything synchronously (scripts, tests)."""
+    load_core()
+    load_history()
+    get_road_graph()
+
+
+def get_road_graph():
+    """Return the road network, building it on first use."""
+    load_core()
+    with _graph_lock:
+        if road_graph is None:
+            _timed("road_graph", build_road_network)
+            ready["road_graph"] = True
+            print(f"Road network built in {timings['road_graph'] * 1000:.0f} ms")
+            events.publish(events.GRAPH_CHANGED, road_graph)
+    return road_graph
+
+
+def readiness_text():
+    """Short human-readable loading status for the UI."""
+    if not ready["core"]:
+        return "Loading bins & facilities..."
+    if not ready["history"]:
+        return f"Loading history ({history_loaded:,} events)..."
+    return "Ready"
+
+
+def log_timings():
+    """Print the startup timing breakdown."""
+    parts = ", ".join(f"{phase} {secs * 1000:.0f} ms" for phase, secs in timings.items())
+    print(f"State loaded: {len(bins)} bins, {len(facilities)} facilities, "
+          f"{len(history)} history events ({parts})")
+
+def log_route_cache():
+    """Print route_cache counters (for tuning its size)."""
+    stats = route_cache.stats()
+    print(f"Route cache: {stats['entries']} routes, {stats['nodes']} nodes, "
+          f"{stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']:.0%}), "
+          f"{stats['evictions']} evictions, {stats['invalidations']} invalidations")
 
 def build_road_network():
     """Build road network connecting bins and facilities."""
-    global road_graph
+    global road_graph, node_index, facility_index
     road_graph = Graph()
+    road_graph.set_default_profile(CITY_SPEED_PROFILE)
     
     # Add all bins and facilities as nodes
     for b in bins:
@@ -66,32 +241,251 @@ def build_road_network():
     for f in facilities:
         road_graph.add_node(f.id, f.lat, f.lon)
     
-    # Connect each bin to its 3 nearest neighbors
+    # Spatial indexes for neighbour lookups (all nodes, and facilities only)
     all_nodes = [(b.id, b.lat, b.lon) for b in bins] + [(f.id, f.lat, f.lon) for f in facilities]
+    node_index = GridIndex(GridIndex.suggest_cell_size((lat, lon) for _, lat, lon in all_nodes))
+    for node_id, lat, lon in all_nodes:
+        node_index.insert(node_id, lat, lon)
+    facility_index = GridIndex(GridIndex.suggest_cell_size((f.lat, f.lon) for f in facilities))
+    for f in facilities:
+        facility_index.insert(f.id, f.lat, f.lon)
     
+    # Connect each node to its 3 nearest neighbors
+    edges = []
     for node_id, lat, lon in all_nodes:
-        # Find 3 nearest neighbors
-        distances = []
-        for other_id, other_lat, other_lon in all_nodes:
-            if node_id != other_id:
-                dist = routing.calculate_distance(lat, lon, other_lat, other_lon) * 111  # km
-                distances.append((dist, other_id))
-        
-        distances.sort()
-        for dist, neighbor_id in distances[:3]:
-            road_graph.add_edge(node_id, neighbor_id, dist)
+        for _, neighbor_id in node_index.nearest(lat, lon, k=ROAD_NEIGHBOURS, exclude=node_id):
+            edges.append((node_id, neighbor_id))
     
     # Ensure each bin has direct connection to nearest facility
     for b in bins:
-        nearest_facility = min(facilities, 
-                              key=lambda f: routing.calculate_distance(b.lat, b.lon, f.lat, f.lon))
-        dist = routing.calculate_distance(b.lat, b.lon, nearest_facility.lat, nearest_facility.lon) * 111
-        road_graph.add_edge(b.id, nearest_facility.id, dist)
+        edges.extend(_facility_edges(b))
+    _add_road_edges(edges)
 
-build_road_network()
+def _facility_edges(b):
+    return [(b.id, facility_id) for _, facility_id in facility_index.nearest(b.lat, b.lon, k=1)]
 
-def save_all():
-    storage.save_bins(bins)
-    storage.save_requests(requests)
-    storage.save_history(history)
-    storage.save_facilities(facilities)
+def _add_road_edges(edges):
+    """Add (a, b) edges weighted by great-circle km, computed in one vectorized pass."""
+    pos = road_graph.positions
+    km = geometry.haversine_pairs([pos[a][0] for a, _ in edges], [pos[a][1] for a, _ in edges],
+                                  [pos[b][0] for _, b in edges], [pos[b][1] for _, b in edges])
+    for (a, b), w in zip(edges, km):
+        road_graph.add_edge(a, b, float(w))
+
+def _attach_bin(b):
+    """Add a bin to the built road network: O(k log n) rather than a rebuild."""
+    with _graph_lock:
+        if road_graph is None:
+            return  # picked up when the graph is first built
+        road_graph.add_node(b.id, b.lat, b.lon)
+        node_index.insert(b.id, b.lat, b.lon)
+        edges = [(b.id, neighbor_id) for _, neighbor_id in
+                 node_index.nearest(b.lat, b.lon, k=ROAD_NEIGHBOURS, exclude=b.id)]
+        _add_road_edges(edges + _facility_edges(b))
+    events.publish(events.GRAPH_CHANGED, road_graph)
+
+def _detach_bin(bin_id):
+    """Remove a bin and its incident edges from the built road network."""
+    with _graph_lock:
+        if road_graph is None:
+            return
+        road_graph.remove_node(bin_id)
+        node_index.remove(bin_id)
+    events.publish(events.GRAPH_CHANGED, road_graph)
+
+def find_route(source, target, method="astar"):
+    """PathResult between two nodes of the road network, via route_cache."""
+    graph = get_road_graph()
+    with _graph_lock:
+        return route_cache.get(graph, source, target, method)
+
+def minute_of_week(when):
+    """Minutes since Monday 00:00 for a datetime (the time axis of speed profiles)."""
+    return when.weekday() * 24 * 60 + when.hour * 60 + when.minute + when.second / 60
+
+def fastest_route(source, target, when=None, method="astar"):
+    """TimedPath for the quickest drive between two nodes leaving at when (default: now)."""
+    graph = get_road_graph()
+    depart = minute_of_week(when or datetime.now())
+    with _graph_lock:
+        return graph.fastest_route(source, target, depart, method)
+
+def get_contraction_hierarchy():
+    """
+    Contraction hierarchy of the current road network, for fast repeated
+    point-to-point queries on large networks. Loaded from ROAD_CH_FILE when
+    it still matches the network, otherwise rebuilt and saved. Not built
+    unless asked for.
+    """
+    global road_ch
+    graph = get_road_graph()
+    with _graph_lock:
+        if road_ch is None or road_ch.signature != graph.signature():
+            road_ch = ContractionHierarchy.for_graph(graph, ROAD_CH_FILE)
+        return road_ch
+
+def route_to_nearest_facility(bin_id):
+    """
+    PathResult from a bin to the facility closest to it by road. Uses the
+    graph's cached shortest-path tree from all facilities, so each call is a
+    predecessor walk; the tree is recomputed only after the network changes.
+    """
+    graph = get_road_graph()
+    with _graph_lock:
+        return graph.path_to_nearest(bin_id, [f.id for f in facilities])
+
+def add_bin(b):
+    """Register a new bin in the bin list, lookup map, urgency heap and road network."""
+    bins.append(b)
+    bins_map.set(b.id, b)
+    for order in bin_order.values():
+        order.add(b.id, b)
+    update_urgency(b)
+    _attach_bin(b)
+    events.publish(events.BIN_ADDED, b)
+
+def remove_bin(bin_id):
+    """Remove a bin from the bin list, lookup map, urgency heap and road network."""
+    b = bins_map.get(bin_id)
+    if not b:
+        return None
+    bins.remove(b)
+    bins_map.remove(bin_id)
+    urgency.remove(bin_id)
+    for order in bin_order.values():
+        order.remove(bin_id)
+    _detach_bin(bin_id)
+    events.publish(events.BIN_REMOVED, b)
+    return b
+
+def update_urgency(b):
+    """Re-key a bin in the urgency heap and fill order after its fill level changed. O(log n)."""
+    urgency.update(b.id, b.fill_level, b)
+    bin_order["fill"].update(b.id, b)
+
+def query_bins(search="", sort_by="fill", descending=False, offset=0, limit=10):
+    """
+    One page of the bin registry: bins whose ID contains search
+    (case-insensitive), in bin_order[sort_by] order. Returns (page, total).
+
+    Without a search the page is a slice of the precomputed order, O(limit);
+    with one it is a single pass over the order, testing IDs only.
+    """
+    order = bin_order[sort_by]
+    query = search.strip().lower()
+    if not query:
+        ids = order.ids(offset, offset + limit, reverse=descending)
+        return [bins_map.get(bin_id) for bin_id in ids], len(order)
+    page = []
+    total = 0
+    for bin_id in order.iter_ids(reverse=descending):
+        if query in bin_id.lower():
+            if offset <= total < offset + limit:
+                page.append(bins_map.get(bin_id))
+            total += 1
+    return page, total
+
+def set_fill_level(b, fill_level):
+    b.fill_level = fill_level
+    update_urgency(b)
+    events.publish(events.BIN_UPDATED, b)
+
+# The list and the log change together under _flush_lock, so a flush that
+# compacts the log from the list (on the timer thread) never sees one
+# without the other.
+def append_history(record):
+    """Record a history event in memory and append it to the on-disk log."""
+    with _flush_lock:
+        history.append(record)
+        storage.append_history(record)
+    history_index.add(record)
+    events.publish(events.HISTORY_APPENDED, record)
+
+def append_history_batch(records):
+    """Record several history events with one write to the on-disk log."""
+    with _flush_lock:
+        history.extend(records)
+        storage.extend_history(records)
+    for record in records:
+        history_index.add(record)
+    for record in records:
+        events.publish(events.HISTORY_APPENDED, record)
+
+def remove_history(record):
+    """Remove a history event (undo). JSON logs are compacted on the next flush."""
+    with _flush_lock:
+        history.remove(record)
+        storage.remove_history(record)
+    history_index.remove(record)
+    save_all("history")
+    events.publish(events.HISTORY_REMOVED, record)
+
+def remove_history_batch(records):
+    """Remove several history events (undo of a batch) in one pass over the list."""
+    doomed = {id(r) for r in records}
+    with _flush_lock:
+        history[:] = [h for h in history if id(h) not in doomed]
+        storage.remove_history_batch(records)
+    for record in records:
+        history_index.remove(record)
+    save_all("history")
+    for record in records:
+        events.publish(events.HISTORY_REMOVED, record)
+
+def add_request(req):
+    """Queue a collection request."""
+    requests.append(req)
+    events.publish(events.REQUEST_ENQUEUED, req)
+
+def remove_request(req):
+    """Take a request off the queue (processed, rejected or undone)."""
+    requests.remove(req)
+    events.publish(events.REQUEST_REMOVED, req)
+
+# ---------- Persistence (dirty tracking + write-behind) ----------
+FLUSH_DELAY = 5.0  # seconds to coalesce changes before writing them out
+
+_savers = {
+    "bins": lambda: storage.save_bins(bins),
+    "requests": lambda: storage.save_requests(requests),
+    "history": storage.flush_history,
+    "facilities": lambda: storage.save_facilities(facilities),
+}
+_dirty = set()
+_flush_lock = threading.RLock()
+_flush_timer = None
+
+def mark_dirty(*collections):
+    """Flag collections ("bins", "requests", "history", "facilities") as changed."""
+    with _flush_lock:
+        _dirty.update(collections or _savers)
+
+def save_all(*collections):
+    """
+    Mark collections as changed and schedule a write-behind flush.
+
+    Changes arriving within FLUSH_DELAY of each other are coalesced into a
+    single write per file, and only dirty files are rewritten. With no
+    arguments every collection is marked dirty.
+    """
+    global _flush_timer
+    mark_dirty(*collections)
+    with _flush_lock:
+        if _flush_timer is None:
+            _flush_timer = threading.Timer(FLUSH_DELAY, flush)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+
+def flush():
+    """Write all dirty collections now (called on timer, shutdown and by tests)."""
+    global _flush_timer
+    with _flush_lock:
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+        for name in list(_dirty):
+            _savers[name]()
+            _dirty.discard(name)
+        storage.flush_history()
+
+atexit.register(flush)
@@ -1,67 +1,792 @@
+import atexit
+import glob
 import json
 import os
-from models import Bin, CollectionRequest
+import sqlite3
+import threading
+import time
+from models import Bin, CollectionRequest, Facility
 
 DATA_DIR = "data"
 BINS_FILE = os.path.join(DATA_DIR, "bins.json")
 REQUESTS_FILE = os.path.join(DATA_DIR, "requests.json")
 HISTORY_FILE = os.path.join(DATA_DIR, "history.json")
+FACILITIES_FILE = os.path.join(DATA_DIR, "facilities.json")
+SQLITE_FILE = os.path.join(DATA_DIR, "greenbin.db")
+
+# Which backend to use: "json" (default) or "sqlite"
+STORAGE_BACKEND = os.environ.get("GREENBIN_STORAGE", "json")
 
 def _ensure_data_dir():
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
 
+HISTORY_DIR = os.path.join(DATA_DIR, "history")
+HISTORY_SEGMENT_MAX_BYTES = 4 * 1024 * 1024  # rotate segments at ~4 MB
+HISTORY_FSYNC_EVERY = 64                     # appends between fsyncs
+HISTORY_FSYNC_INTERVAL = 1.0                 # max seconds between fsyncs
+
+
+class HistoryLog:
+    """
+    Append-only JSONL store for history events.
+
+    Each event is written as one line to the active segment file
+    (history-000001.jsonl, history-000002.jsonl, ...). Appends are O(1)
+    regardless of how much history exists; writes are fsync'd in batches and
+    the active segment is rotated once it grows past segment_max_bytes.
+    Writes are locked, since the write-behind flush (and with it compaction)
+    runs on a timer thread while appends come from the event loop.
+    """
+
+    SEGMENT_PATTERN = "history-*.jsonl"
+    COMPACT_TMP = "compact.tmp"
+    COMPACT_DONE = "compact.jsonl"
+
+    def __init__(self, directory=HISTORY_DIR, legacy_file=HISTORY_FILE,
+                 segment_max_bytes=HISTORY_SEGMENT_MAX_BYTES,
+                 fsync_every=HISTORY_FSYNC_EVERY,
+                 fsync_interval=HISTORY_FSYNC_INTERVAL):
+        self.directory = directory
+        self.legacy_file = legacy_file
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.RLock()
+        self._file = None
+        self._segment_index = 0
+        self._segment_size = 0
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def _segment_path(self, index):
+        return os.path.join(self.directory, f"history-{index:06d}.jsonl")
+
+    def _segments(self):
+        return sorted(glob.glob(os.path.join(self.directory, self.SEGMENT_PATTERN)))
+
+    def _ensure_dir(self):
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+    def _recover(self):
+        """Finish an interrupted compaction, if any."""
+        tmp = os.path.join(self.directory, self.COMPACT_TMP)
+        done = os.path.join(self.directory, self.COMPACT_DONE)
+        if os.path.exists(done):
+            # Compacted file is complete: drop the old segments it replaces
+            for path in self._segments():
+                os.remove(path)
+            os.replace(done, self._segment_path(1))
+        if os.path.exists(tmp):
+            # Compaction died mid-write; the old segments are still intact
+            os.remove(tmp)
+
+    def _migrate_legacy(self):
+        """
+        Import a legacy history.json into the log (one-time). The file is
+        left where it is (it may be tracked); once segments exist it is
+        ignored.
+        """
+        if self._segments() or not os.path.exists(self.legacy_file):
+            return
+        with open(self.legacy_file, "r") as f:
+            records = json.load(f)
+        self.rewrite(records)
+
+    def iter_records(self):
+        """
+        Iterator over every event from all segments, oldest first. The end
+        of the log is fixed by this call: events appended afterwards are
+        not yielded.
+        """
+        with self._lock:
+            self._ensure_dir()
+            self._recover()
+            self._migrate_legacy()
+            segments = self._segments()
+            if self._file is not None:
+                self._file.flush()
+            end = os.path.getsize(segments[-1]) if segments else 0
+        return self._read(segments, end)
+
+    @staticmethod
+    def _read(segments, end):
+        # end: byte size of the last segment to read up to
+        for k, path in enumerate(segments):
+            last = k == len(segments) - 1
+            read = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    if last:
+                        read += len(line)
+                        if read > end:
+                            break
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # Torn final line from a crash mid-append
+                        continue
+
+    def load(self):
+        return list(self.iter_records())
+
+    def _open_active(self):
+        self._ensure_dir()
+        # An append can come before the first read; import the legacy file
+        # first, or the new segment would make the migration skip it
+        self._recover()
+        self._migrate_legacy()
+        segments = self._segments()
+        if segments:
+            last = segments[-1]
+            self._segment_index = int(os.path.basename(last)[len("history-"):-len(".jsonl")])
+        else:
+            self._segment_index = 1
+        path = self._segment_path(self._segment_index)
+        self._file = open(path, "a")
+        self._segment_size = self._file.tell()
+
+    def _rotate(self):
+        self.flush()
+        self._file.close()
+        self._segment_index += 1
+        self._file = open(self._segment_path(self._segment_index), "a")
+        self._segment_size = 0
+
+    def append(self, record):
+        """Append a single event to the log."""
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._open_active()
+            self._file.write(line)
+            self._segment_size += len(line)
+            self._pending += 1
+            if (self._pending >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self.flush()
+            if self._segment_size >= self.segment_max_bytes:
+                self._rotate()
+
+    def extend(self, records):
+        """Append several events with a single write-out and fsync."""
+        with self._lock:
+            if self._file is None:
+                self._open_active()
+            for record in records:
+                line = json.dumps(record, separators=(",", ":")) + "\n"
+                self._file.write(line)
+                self._segment_size += len(line)
+                self._pending += 1
+                if self._segment_size >= self.segment_max_bytes:
+                    self._rotate()
+            self.flush()
+
+    def flush(self):
+        """Flush buffered appends and fsync the active segment."""
+        with self._lock:
+            if self._file is not None and self._pending:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            self._pending = 0
+            self._last_sync = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self.flush()
+                self._file.close()
+                self._file = None
+
+    def rewrite(self, records):
+        """
+        Replace the whole log with records (compaction).
+
+        Only needed when events are removed (e.g. undo), since the log itself
+        never edits lines in place.
+        """
+        with self._lock:
+            self.close()
+            self._ensure_dir()
+            tmp = os.path.join(self.directory, self.COMPACT_TMP)
+            done = os.path.join(self.directory, self.COMPACT_DONE)
+            with open(tmp, "w") as f:
+                for record in records:
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, done)
+            self._recover()
+
+
+
+def _as_set(value):
+    """Normalize a filter value (None, scalar or list) to a set or None."""
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return set(value)
+    return {value}
+
+
+def _matches(record, statuses, types, bin_ids, sources, since, until):
+    if statuses is not None and record.get("status") not in statuses:
+        return False
+    if types is not None and record.get("type") not in types:
+        return False
+    if bin_ids is not None and record.get("bin_id") not in bin_ids:
+        return False
+    if sources is not None and record.get("source") not in sources:
+        return False
+    ts = record.get("timestamp", "")
+    if since is not None and ts < since:
+        return False
+    if until is not None and ts > until:
+        return False
+    return True
+
+
+class StorageBackend:
+    """
+    Interface implemented by every storage backend.
+
+    History filters (status, waste_type, bin_id, source) accept a single value
+    or a list of values; since/until compare against the timestamp string.
+    Query results come back in insertion (chronological) order unless
+    descending is set.
+    """
+
+    def load_bins(self):
+        raise NotImplementedError
+
+    def save_bins(self, bins):
+        raise NotImplementedError
+
+    def load_requests(self):
+        raise NotImplementedError
+
+    def save_requests(self, requests):
+        raise NotImplementedError
+
+    def load_facilities(self):
+        raise NotImplementedError
+
+    def save_facilities(self, facilities):
+        raise NotImplementedError
+
+    def stream_history(self, into, batch_size=5000):
+        """
+        Load stored history into the list `into` in batches, oldest first.
+
+        Generator: first yields 0 once the end of the stored history is
+        fixed, then the number of records loaded so far after each batch,
+        so callers can report progress or hand control back. Records
+        already in `into` at that point are stored ones and are dropped to
+        be read back in order; callers that append concurrently should hold
+        their write lock until the first yield. Each batch is inserted after
+        the records already loaded, so events appended to `into` while
+        streaming stay at the end.
+        """
+        raise NotImplementedError
+
+    def load_history(self):
+        records = []
+        for _ in self.stream_history(records):
+            pass
+        return records
+
+    def append_history(self, record):
+        raise NotImplementedError
+
+    def extend_history(self, records):
+        for record in records:
+            self.append_history(record)
+
+    def remove_history(self, record):
+        raise NotImplementedError
+
+    def remove_history_batch(self, records):
+        for record in records:
+            self.remove_history(record)
+
+    def save_history(self, history):
+        raise NotImplementedError
+
+    def flush_history(self):
+        pass
+
+    def query_history(self, status=None, waste_type=None, bin_id=None, source=None,
+                      since=None, until=None, descending=False, limit=None, offset=0):
+        raise NotImplementedError
+
+    def count_history(self, status=None, waste_type=None, bin_id=None, source=None,
+                      since=None, until=None):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class JSONBackend(StorageBackend):
+    """Whole-file JSON for bins/requests/facilities plus the JSONL history log."""
+
+    def __init__(self):
+        self.history_log = HistoryLog()
+        self._history = []
+        self._history_loaded = False
+        self._compact_pending = False
+
+    def load_bins(self):
+        _ensure_data_dir()
+        if not os.path.exists(BINS_FILE):
+            return []
+        with open(BINS_FILE, "r") as f:
+            data = json.load(f)
+            return [Bin.from_dict(item) for item in data]
+
+    def save_bins(self, bins):
+        _ensure_data_dir()
+        with open(BINS_FILE, "w") as f:
+            json.dump([b.to_dict() for b in bins], f, indent=2)
+
+    def load_requests(self):
+        _ensure_data_dir()
+        if not os.path.exists(REQUESTS_FILE):
+            return []
+        with open(REQUESTS_FILE, "r") as f:
+            data = json.load(f)
+            return [CollectionRequest.from_dict(item) for item in data]
+
+    def save_requests(self, requests):
+        _ensure_data_dir()
+        with open(REQUESTS_FILE, "w") as f:
+            json.dump([r.to_dict() for r in requests], f, indent=2)
+
+    def load_facilities(self):
+        _ensure_data_dir()
+        if not os.path.exists(FACILITIES_FILE):
+            return []
+        with open(FACILITIES_FILE, "r") as f:
+            data = json.load(f)
+            return [Facility.from_dict(item) for item in data]
+
+    def save_facilities(self, facilities):
+        _ensure_data_dir()
+        with open(FACILITIES_FILE, "w") as f:
+            json.dump([f.to_dict() for f in facilities], f, indent=2)
+
+    # The list loaded into is the caller's live history list; appends and
+    # removals are mirrored into it by state, and queries scan it.
+    def stream_history(self, into, batch_size=5000):
+        self._history = into
+        records = self.history_log.iter_records()
+        del into[:]
+        yield 0
+        loaded = 0
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                into[loaded:loaded] = batch
+                loaded += len(batch)
+                batch = []
+                yield loaded
+        if batch:
+            into[loaded:loaded] = batch
+            loaded += len(batch)
+            yield loaded
+        self._history_loaded = True
+
+    def append_history(self, record):
+        self.history_log.append(record)
+
+    def extend_history(self, records):
+        self.history_log.extend(records)
+
+    def remove_history(self, record):
+        # Log lines are never edited in place; compact on the next flush
+        self._compact_pending = True
+
+    def save_history(self, history):
+        self._history = history
+        # Snapshot, as the event loop may append to the list meanwhile
+        self.history_log.rewrite(list(history))
+        self._compact_pending = False
+
+    def flush_history(self):
+        # Never compact from a partially streamed list
+        if self._compact_pending and self._history_loaded:
+            self.save_history(self._history)
+        else:
+            self.history_log.flush()
+
+    def query_history(self, status=None, waste_type=None, bin_id=None, source=None,
+                      since=None, until=None, descending=False, limit=None, offset=0):
+        filters = (_as_set(status), _as_set(waste_type), _as_set(bin_id), _as_set(source), since, until)
+        records = reversed(self._history) if descending else iter(self._history)
+        out = []
+        skipped = 0
+        for record in records:
+            if not _matches(record, *filters):
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            out.append(record)
+            if limit is not None and len(out) >= limit:
+                break
+        return out
+
+    def count_history(self, status=None, waste_type=None, bin_id=None, source=None,
+                      since=None, until=None):
+        filters = (_as_set(status), _as_set(waste_type), _as_set(bin_id), _as_set(source), since, until)
+        return sum(1 for record in self._history if _matches(record, *filters))
+
+    def close(self):
+        self.flush_history()
+        self.history_log.close()
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    SQLite (WAL mode) backend.
+
+    History rows keep the full record as JSON in `data` and copy the
+    filterable fields into indexed columns, so queries never scan the table.
+    On first open the database is seeded from any existing JSON data.
+    """
+
+    SCHEMA_VERSION = 1
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS bins (
+            id TEXT PRIMARY KEY,
+            waste_type TEXT,
+            lat REAL,
+            lon REAL,
+            fill_level INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_bins_type ON bins(waste_type);
+
+        CREATE TABLE IF NOT EXISTS requests (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            bin_id TEXT,
+            timestamp TEXT,
+            status TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_requests_bin ON requests(bin_id);
+        CREATE INDEX IF NOT EXISTS idx_requests_status ON requests(status);
+
+        CREATE TABLE IF NOT EXISTS facilities (
+            id TEXT PRIMARY KEY,
+            lat REAL,
+            lon REAL,
+            capacity INTEGER,
+            efficiency REAL
+        );
+
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            bin_id TEXT,
+            type TEXT,
+            status TEXT,
+            source TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_history_bin ON history(bin_id, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_history_status ON history(status);
+        CREATE INDEX IF NOT EXISTS idx_history_type ON history(type);
+        CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history(timestamp);
+    """
+
+    # SQLite caps bound parameters per statement; chunk large IN (...) lists
+    MAX_IN_PARAMS = 500
+
+    def __init__(self, path=SQLITE_FILE):
+        _ensure_data_dir()
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < self.SCHEMA_VERSION:
+            self._import_json()
+            self._conn.execute(f"PRAGMA user_version={self.SCHEMA_VERSION}")
+            self._conn.commit()
+
+    def _import_json(self):
+        legacy = JSONBackend()
+        self.save_bins(legacy.load_bins())
+        self.save_requests(legacy.load_requests())
+        self.save_facilities(legacy.load_facilities())
+        history = legacy.load_history()
+        legacy.close()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO history (timestamp, bin_id, type, status, source, data) VALUES (?, ?, ?, ?, ?, ?)",
+                [self._history_row(r) for r in history],
+            )
+
+    @staticmethod
+    def _history_row(record):
+        return (
+            record.get("timestamp"),
+            record.get("bin_id"),
+            record.get("type"),
+            record.get("status"),
+            record.get("source"),
+            json.dumps(record, separators=(",", ":")),
+        )
+
+    def load_bins(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT id, waste_type, lat, lon, fill_level FROM bins ORDER BY rowid").fetchall()
+        return [Bin(id=r[0], waste_type=r[1], lat=r[2], lon=r[3], fill_level=r[4]) for r in rows]
+
+    def save_bins(self, bins):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM bins")
+            self._conn.executemany(
+                "INSERT INTO bins (id, waste_type, lat, lon, fill_level) VALUES (?, ?, ?, ?, ?)",
+                [(b.id, b.waste_type, b.lat, b.lon, b.fill_level) for b in bins],
+            )
+
+    def load_requests(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT bin_id, timestamp, status FROM requests ORDER BY seq").fetchall()
+        return [CollectionRequest(bin_id=r[0], timestamp=r[1], status=r[2]) for r in rows]
+
+    def save_requests(self, requests):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM requests")
+            self._conn.executemany(
+                "INSERT INTO requests (bin_id, timestamp, status) VALUES (?, ?, ?)",
+                [(r.bin_id, r.timestamp, r.status) for r in requests],
+            )
+
+    def load_facilities(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT id, lat, lon, capacity, efficiency FROM facilities ORDER BY rowid").fetchall()
+        return [Facility(id=r[0], lat=r[1], lon=r[2], capacity=r[3], efficiency=r[4]) for r in rows]
+
+    def save_facilities(self, facilities):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM facilities")
+            self._conn.executemany(
+                "INSERT INTO facilities (id, lat, lon, capacity, efficiency) VALUES (?, ?, ?, ?, ?)",
+                [(f.id, f.lat, f.lon, f.capacity, f.efficiency) for f in facilities],
+            )
+
+    def stream_history(self, into, batch_size=5000):
+        # Keyset pagination so the lock is only held per batch, up to the
+        # last row present at the start (later rows are already in `into`)
+        with self._lock:
+            end_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM history").fetchone()[0]
+        del into[:]
+        yield 0
+        last_id = 0
+        loaded = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, data FROM history WHERE id > ? AND id <= ? ORDER BY id LIMIT ?",
+                    (last_id, end_id, batch_size),
+                ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            into[loaded:loaded] = [json.loads(r[1]) for r in rows]
+            loaded += len(rows)
+            yield loaded
+
+    def append_history(self, record):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO history (timestamp, bin_id, type, status, source, data) VALUES (?, ?, ?, ?, ?, ?)",
+                self._history_row(record),
+            )
+
+    def extend_history(self, records):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO history (timestamp, bin_id, type, status, source, data) VALUES (?, ?, ?, ?, ?, ?)",
+                [self._history_row(r) for r in records],
+            )
+
+    def remove_history(self, record):
+        self.remove_history_batch([record])
+
+    def remove_history_batch(self, records):
+        # Records carry no id of their own; delete the newest matching row
+        # for each, all in one transaction
+        with self._lock, self._conn:
+            for record in records:
+                self._conn.execute(
+                    "DELETE FROM history WHERE id = (SELECT id FROM history WHERE data = ? ORDER BY id DESC LIMIT 1)",
+                    (json.dumps(record, separators=(",", ":")),),
+                )
+
+    def save_history(self, history):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM history")
+            self._conn.executemany(
+                "INSERT INTO history (timestamp, bin_id, type, status, source, data) VALUES (?, ?, ?, ?, ?, ?)",
+                [self._history_row(r) for r in history],
+            )
+
+    def _where(self, status, waste_type, bin_id, source, since, until):
+        clauses = []
+        params = []
+        for column, value in (("status", status), ("type", waste_type), ("bin_id", bin_id), ("source", source)):
+            values = _as_set(value)
+            if values is None:
+                continue
+            values = sorted(values, key=str)
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp <= ?")
+            params.append(until)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def _bin_chunks(self, bin_id):
+        """bin_id split into lists of at most MAX_IN_PARAMS, or None if it fits one query."""
+        bin_ids = _as_set(bin_id)
+        if bin_ids is None or len(bin_ids) <= self.MAX_IN_PARAMS:
+            return None
+        bin_ids = sorted(bin_ids, key=str)
+        return [bin_ids[i:i + self.MAX_IN_PARAMS] for i in range(0, len(bin_ids), self.MAX_IN_PARAMS)]
+
+    def query_history(self, status=None, waste_type=None, bin_id=None, source=None,
+                      since=None, until=None, descending=False, limit=None, offset=0):
+        chunks = self._bin_chunks(bin_id)
+        if chunks is not None:
+            # Large bin lists: query in chunks and merge by row id. The page
+            # is within the first offset + limit rows of the merged order, so
+            # no chunk needs to return more than that.
+            top = None if limit is None else offset + limit
+            rows = []
+            for chunk in chunks:
+                rows.extend(self._select("id, data", status, waste_type, chunk,
+                                         source, since, until, descending, top, 0))
+            rows.sort(key=lambda r: r[0], reverse=descending)
+            rows = rows[offset:top]
+            return [json.loads(r[1]) for r in rows]
+        rows = self._select("id, data", status, waste_type, bin_id, source, since, until, descending, limit, offset)
+        return [json.loads(r[1]) for r in rows]
+
+    def _select(self, columns, status, waste_type, bin_id, source, since, until, descending, limit, offset):
+        where, params = self._where(status, waste_type, bin_id, source, since, until)
+        sql = f"SELECT {columns} FROM history{where} ORDER BY id {'DESC' if descending else 'ASC'}"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params += [-1 if limit is None else limit, offset]
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def count_history(self, status=None, waste_type=None, bin_id=None, source=None,
+                      since=None, until=None):
+        chunks = self._bin_chunks(bin_id)
+        if chunks is not None:
+            # chunks hold disjoint bin ids, so their counts add up
+            return sum(self.count_history(status, waste_type, chunk, source, since, until)
+                       for chunk in chunks)
+        where, params = self._where(status, waste_type, bin_id, source, since, until)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM history{where}", params).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ---------- Active backend ----------
+_backend = None
+# The loader thread and the event loop can both reach storage first; only
+# one of them may build (and migrate into) the backend
+_backend_lock = threading.Lock()
+
+def get_backend():
+    """Return the active backend, creating it from STORAGE_BACKEND on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = SQLiteBackend() if STORAGE_BACKEND == "sqlite" else JSONBackend()
+    return _backend
+
+def set_backend(backend):
+    """Swap the active backend (e.g. an in-memory SQLite database for tests)."""
+    global _backend
+    _backend = backend
+
+
+def close():
+    """Close the active backend, if one was opened."""
+    if _backend is not None:
+        _backend.close()
+
+# Registered at import, before any module that flushes through storage at
+# exit (state.flush), so atexit's reverse order closes the backend last
+atexit.register(close)
+
+
 def load_bins():
-    _ensure_data_dir()
-    if not os.path.exists(BINS_FILE):
-        return []
-    with open(BINS_FILE, "r") as f:
-        data = json.load(f)
-        return [Bin.from_dict(item) for item in data]
+    return get_backend().load_bins()
 
 def save_bins(bins):
-    _ensure_data_dir()
-    with open(BINS_FILE, "w") as f:
-        json.dump([b.to_dict() for b in bins], f, indent=2)
+    get_backend().save_bins(bins)
 
 def load_requests():
-    _ensure_data_dir()
-    if not os.path.exists(REQUESTS_FILE):
-        return []
-    with open(REQUESTS_FILE, "r") as f:
-        data = json.load(f)
-        return [CollectionRequest.from_dict(item) for item in data]
+    return get_backend().load_requests()
 
 def save_requests(requests):
-    _ensure_data_dir()
-    with open(REQUESTS_FILE, "w") as f:
-        json.dump([r.to_dict() for r in requests], f, indent=2)
+    get_backend().save_requests(requests)
+
+def load_facilities():
+    return get_backend().load_facilities()
+
+def save_facilities(facilities):
+    get_backend().save_facilities(facilities)
 
 def load_history():
-    _ensure_data_dir()
-    if not os.path.exists(HISTORY_FILE):
-        return []
-    with open(HISTORY_FILE, "r") as f:
-        return json.load(f)
+    return get_backend().load_history()
+
+def stream_history(into, batch_size=5000):
+    return get_backend().stream_history(into, batch_size)
+
+def append_history(record):
+    get_backend().append_history(record)
+
+def extend_history(records):
+    get_backend().extend_history(records)
+
+def remove_history(record):
+    get_backend().remove_history(record)
+
+def remove_history_batch(records):
+    get_backend().remove_history_batch(records)
 
 def save_history(history):
-    _ensure_data_dir()
-    with open(HISTORY_FILE, "w") as f:
-        json.dump(history, f, indent=2)
+    get_backend().save_history(history)
 
-FACILITIES_FILE = os.path.join(DATA_DIR, "facilities.json")
+def flush_history():
+    get_backend().flush_history()
 
-def load_facilities():
-    _ensure_data_dir()
-    if not os.path.exists(FACILITIES_FILE):
-        return []
-    with open(FACILITIES_FILE, "r") as f:
-        data = json.load(f)
-        # Import inside function to avoid circular imports if any, though top level is fine usually
-        from models.facility import Facility
-        return [Facility.from_dict(item) for item in data]
+def query_history(**filters):
+    """Return history records matching filters (see StorageBackend.query_history)."""
+    return get_backend().query_history(**filters)
 
-def save_facilities(facilities):
-    _ensure_data_dir()
-    with open(FACILITIES_FILE, "w") as f:
-        json.dump([f.to_dict() for f in facilities], f, indent=2)
+def count_history(**filters):
+    """Count history records matching filters without materializing them."""
+    return get_backend().count_history(**filters)
@@ -1,9 +1,10 @@
-# Minimal AVL tree implementation keyed by comparable key.
+# AVL tree keyed by comparable key, with subtree sizes for order statistics.
 class AVLNode:
     def __init__(self, key, value):
         self.key = key
         self.value = value
         self.height = 1
+        self.size = 1
         self.left = None
         self.right = None
 
@@ -16,6 +17,14 @@ class AVLTree:
     def _height(self, node):
         return node.height if node else 0
 
+    # helper subtree size
+    def _size(self, node):
+        return node.size if node else 0
+
+    def _update(self, node):
+        node.height = 1 + max(self._height(node.left), self._height(node.right))
+        node.size = 1 + self._size(node.left) + self._size(node.right)
+
     # balance factor
     def _bf(self, node):
         return self._height(node.left) - self._height(node.right) if node else 0
@@ -26,8 +35,8 @@ class AVLTree:
         T2 = x.right
         x.right = y
         y.left = T2
-        y.height = 1 + max(self._height(y.left), self._height(y.right))
-        x.height = 1 + max(self._height(x.left), self._height(x.right))
+        self._update(y)
+        self._update(x)
         return x
 
     # rotate left
@@ -36,10 +45,27 @@ class AVLTree:
         T2 = y.left
         y.left = x
         x.right = T2
-        x.height = 1 + max(self._height(x.left), self._height(x.right))
-        y.height = 1 + max(self._height(y.left), self._height(y.right))
+        self._update(x)
+        self._update(y)
         return y
 
+    def _rebalance(self, node):
+        self._update(node)
+        balance = self._bf(node)
+        if balance > 1:
+            # LR
+            if self._bf(node.left) < 0:
+                node.left = self._rotate_left(node.left)
+            # LL
+            return self._rotate_right(node)
+        if balance < -1:
+            # RL
+            if self._bf(node.right) > 0:
+                node.right = self._rotate_right(node.right)
+            # RR
+            return self._rotate_left(node)
+        return node
+
     def _insert(self, node, key, value):
         if not node:
             return AVLNode(key, value)
@@ -50,53 +76,200 @@ class AVLTree:
         else:
             node.value = value
             return node
-
-        node.height = 1 + max(self._height(node.left),
-                              self._height(node.right))
-        balance = self._bf(node)
-
-        # LL
-        if balance > 1 and key < node.left.key:
-            return self._rotate_right(node)
-        # RR
-        if balance < -1 and key > node.right.key:
-            return self._rotate_left(node)
-        # LR
-        if balance > 1 and key > node.left.key:
-            node.left = self._rotate_left(node.left)
-            return self._rotate_right(node)
-        # RL
-        if balance < -1 and key < node.right.key:
-            node.right = self._rotate_right(node.right)
-            return self._rotate_left(node)
-
-        return node
+        return self._rebalance(node)
 
     def insert(self, key, value):
         self.root = self._insert(self.root, key, value)
 
-    # minimal get
-    def _get(self, node, key):
+    def _delete(self, node, key):
         if not node:
-            return None
-        if key == node.key:
-            return node.value
+            return None, False
         if key < node.key:
-            return self._get(node.left, key)
-        return self._get(node.right, key)
+            node.left, removed = self._delete(node.left, key)
+        elif key > node.key:
+            node.right, removed = self._delete(node.right, key)
+        else:
+            if not node.left:
+                return node.right, True
+            if not node.right:
+                return node.left, True
+            # replace with in-order successor
+            succ = node.right
+            while succ.left:
+                succ = succ.left
+            node.key, node.value = succ.key, succ.value
+            node.right, removed = self._delete(node.right, succ.key)
+        if not removed:
+            return node, False
+        return self._rebalance(node), True
+
+    def delete(self, key):
+        """Remove key; returns True if it was present."""
+        self.root, removed = self._delete(self.root, key)
+        return removed
+
+    def bulk_load(self, items):
+        """Replace the tree with (key, value) pairs already sorted by key. O(n)."""
+        items = list(items)
 
+        def build(lo, hi):
+            if lo >= hi:
+                return None
+            mid = (lo + hi) // 2
+            node = AVLNode(*items[mid])
+            node.left = build(lo, mid)
+            node.right = build(mid + 1, hi)
+            self._update(node)
+            return node
+
+        self.root = build(0, len(items))
+
+    # get (iterative)
     def get(self, key):
-        return self._get(self.root, key)
+        node = self.root
+        while node:
+            if key == node.key:
+                return node.value
+            node = node.left if key < node.key else node.right
+        return None
 
-    # inorder values (sorted by key)
-    def _inorder(self, node, out):
-        if not node:
-            return
-        self._inorder(node.left, out)
-        out.append(node.value)
-        self._inorder(node.right, out)
+    def __contains__(self, key):
+        node = self.root
+        while node:
+            if key == node.key:
+                return True
+            node = node.left if key < node.key else node.right
+        return False
+
+    def __len__(self):
+        return self._size(self.root)
+
+    # ---------- Lazy in-order traversal ----------
+    def iter_items(self, lo=None, hi=None, reverse=False):
+        """
+        Lazily yield (key, value) pairs with lo <= key < hi in key order
+        (descending if reverse). Uses an explicit stack, so it never recurses
+        and only descends into subtrees that can hold keys in range.
+        """
+        def in_range_low(key):
+            return lo is None or key >= lo
+
+        def in_range_high(key):
+            return hi is None or key < hi
+
+        stack = []
+        node = self.root
+        if not reverse:
+            while stack or node:
+                while node:
+                    if in_range_low(node.key):
+                        stack.append(node)
+                        node = node.left
+                    else:
+                        node = node.right
+                if not stack:
+                    return
+                node = stack.pop()
+                if not in_range_high(node.key):
+                    return
+                yield node.key, node.value
+                node = node.right
+        else:
+            while stack or node:
+                while node:
+                    if in_range_high(node.key):
+                        stack.append(node)
+                        node = node.right
+                    else:
+                        node = node.left
+                if not stack:
+                    return
+                node = stack.pop()
+                if not in_range_low(node.key):
+                    return
+                yield node.key, node.value
+                node = node.left
 
+    def __iter__(self):
+        for key, _ in self.iter_items():
+            yield key
+
+    def keys(self):
+        return [k for k, _ in self.iter_items()]
+
+    # inorder values (sorted by key)
     def values(self):
+        return [v for _, v in self.iter_items()]
+
+    def range(self, lo=None, hi=None, reverse=False):
+        """Values with lo <= key < hi (either bound may be None)."""
+        return [v for _, v in self.iter_items(lo, hi, reverse)]
+
+    def prefix(self, prefix):
+        """Values whose (string) key starts with prefix, in key order."""
+        out = []
+        for key, value in self.iter_items(lo=prefix):
+            if not key.startswith(prefix):
+                break
+            out.append(value)
+        return out
+
+    # ---------- Order statistics ----------
+    def rank(self, key):
+        """Number of keys strictly smaller than key."""
+        r = 0
+        node = self.root
+        while node:
+            if key <= node.key:
+                node = node.left
+            else:
+                r += self._size(node.left) + 1
+                node = node.right
+        return r
+
+    def select(self, i):
+        """Value of the i-th smallest key (0-based)."""
+        node = self.root
+        while node:
+            left = self._size(node.left)
+            if i < left:
+                node = node.left
+            elif i == left:
+                return node.value
+            else:
+                i -= left + 1
+                node = node.right
+        raise IndexError("AVLTree index out of range")
+
+    def page(self, offset, limit, reverse=False):
+        """
+        Values at sorted positions offset .. offset+limit-1 (descending order
+        if reverse). O(log n + limit): seeks to offset via subtree sizes and
+        then walks in order.
+        """
+        if offset < 0 or limit <= 0:
+            return []
+        stack = []
+        node = self.root
+        i = offset
+        # seek: push ancestors whose key comes after the offset position
+        while node:
+            near = self._size(node.right if reverse else node.left)
+            if i < near:
+                stack.append(node)
+                node = node.right if reverse else node.left
+            elif i == near:
+                stack.append(node)
+                break
+            else:
+                i -= near + 1
+                node = node.left if reverse else node.right
         out = []
-        self._inorder(self.root, out)
+        while stack and len(out) < limit:
+            node = stack.pop()
+            out.append(node.value)
+            child = node.left if reverse else node.right
+            while child:
+                stack.append(child)
+                child = child.right if reverse else child.left
         return out
@@ -0,0 +1,277 @@
+# Contraction hierarchy over structures.graph.Graph for fast point-to-point queries.
+import heapq
+import json
+import os
+from array import array
+
+INF = float('inf')
+
+
+class ContractionHierarchy:
+    """
+    Preprocessed form of a Graph answering shortest-path queries by a
+    bidirectional search that only ever moves "upward" in a node ordering.
+
+    Preprocessing contracts nodes one at a time (least important first, by
+    edge difference). Contracting v adds a shortcut u-w wherever u-v-w was
+    the only shortest connection between two of its remaining neighbours.
+    Each node keeps the edges to nodes contracted after it (its "upward"
+    edges). A query then settles a few hundred nodes instead of a large
+    part of the network.
+
+    Shortcuts remember the node they bypass, so paths are unpacked to the
+    original nodes. Distances always equal Dijkstra's. The path itself is
+    the same as Graph.dijkstra whenever the shortest path is unique; among
+    equal-length paths either search may pick a different one.
+
+    The hierarchy is a snapshot: rebuild it (or let load() reject it via
+    Graph.signature()) after the network changes.
+    """
+
+    WITNESS_SETTLE_LIMIT = 60  # bound on each witness search during preprocessing
+
+    def __init__(self, ids, rank, offsets, targets, weights, mids, signature=None):
+        self.ids = ids                      # index -> node id
+        self.index_of = {node_id: i for i, node_id in enumerate(ids)}
+        self.rank = rank                    # array('i'): contraction order
+        self.offsets = offsets              # array('q'), len V + 1
+        self.targets = targets              # array('i'): upward neighbour
+        self.weights = weights              # array('d')
+        self.mids = mids                    # array('i'): bypassed node, -1 for a road edge
+        self.signature = signature          # Graph.signature() it was built from
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def shortcut_count(self):
+        return sum(1 for m in self.mids if m != -1)
+
+    # ---------- Preprocessing ----------
+    @classmethod
+    def build(cls, graph):
+        """Contract every node of graph. Roughly O(V * d^2 * witness cost)."""
+        ids = list(graph.adj)
+        index_of = {node_id: i for i, node_id in enumerate(ids)}
+        n = len(ids)
+        # working adjacency among uncontracted nodes: i -> {j: (weight, mid)}
+        adj = [dict() for _ in range(n)]
+        for node_id, edges in graph.adj.items():
+            i = index_of[node_id]
+            for v, w in edges:
+                j = index_of[v]
+                if j != i and w < adj[i].get(j, (INF,))[0]:
+                    adj[i][j] = (w, -1)
+                    adj[j][i] = (w, -1)
+
+        limit = cls.WITNESS_SETTLE_LIMIT
+
+        def witness(u, skip, max_dist, wanted):
+            # distances from u avoiding skip; stops past max_dist, after
+            # limit settled nodes or once every wanted node is settled
+            dist = {u: 0.0}
+            heap = [(0.0, u)]
+            settled = 0
+            remaining = len(wanted)
+            while heap:
+                d, x = heapq.heappop(heap)
+                if d > dist[x]:
+                    continue
+                if d > max_dist or settled >= limit:
+                    break
+                settled += 1
+                if x in wanted:
+                    remaining -= 1
+                    if not remaining:
+                        break
+                for y, (w, _) in adj[x].items():
+                    if y == skip:
+                        continue
+                    alt = d + w
+                    if alt < dist.get(y, INF):
+                        dist[y] = alt
+                        heapq.heappush(heap, (alt, y))
+            return dist
+
+        def shortcuts(v):
+            # (u, x, weight) shortcuts needed if v were contracted now
+            nbrs = list(adj[v].items())
+            out = []
+            for a in range(len(nbrs) - 1):
+                u, (wu, _) = nbrs[a]
+                rest = nbrs[a + 1:]
+                max_dist = wu + max(w for _, (w, _) in rest)
+                dist = witness(u, v, max_dist, {x for x, _ in rest})
+                for x, (wx, _) in rest:
+                    via = wu + wx
+                    if dist.get(x, INF) > via:
+                        out.append((u, x, via))
+            return out
+
+        deleted = [0] * n  # contracted neighbours, spreads contraction evenly
+
+        heap = [(len(shortcuts(v)) - len(adj[v]), v) for v in range(n)]
+        heapq.heapify(heap)
+        rank = array('i', [0]) * n
+        up = [None] * n
+        order = 0
+        while heap:
+            _, v = heapq.heappop(heap)
+            # lazy update: re-evaluate, contract only if still the minimum
+            added = shortcuts(v)
+            p = len(added) - len(adj[v]) + deleted[v]
+            if heap and p > heap[0][0]:
+                heapq.heappush(heap, (p, v))
+                continue
+            for u, x, w in added:
+                if w < adj[u].get(x, (INF,))[0]:
+                    adj[u][x] = (w, v)
+                    adj[x][u] = (w, v)
+            up[v] = [(j, w, mid) for j, (w, mid) in adj[v].items()]
+            for j in adj[v]:
+                del adj[j][v]
+                deleted[j] += 1
+            adj[v] = {}
+            rank[v] = order
+            order += 1
+
+        offsets = array('q', [0])
+        targets = array('i')
+        weights = array('d')
+        mids = array('i')
+        for v in range(n):
+            for j, w, mid in up[v]:
+                targets.append(j)
+                weights.append(w)
+                mids.append(mid)
+            offsets.append(len(targets))
+        return cls(ids, rank, offsets, targets, weights, mids, graph.signature())
+
+    # ---------- Persistence ----------
+    def save(self, path):
+        """Write the hierarchy as JSON (atomically, via a temp file)."""
+        data = {
+            "signature": self.signature,
+            "ids": self.ids,
+            "rank": list(self.rank),
+            "offsets": list(self.offsets),
+            "targets": list(self.targets),
+            "weights": list(self.weights),
+            "mids": list(self.mids),
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, graph=None):
+        """
+        Read a saved hierarchy. With graph given, returns None unless it was
+        built from a graph with the same signature (i.e. it is still valid).
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable contraction hierarchy {path}: {e}")
+            return None
+        if graph is not None and data.get("signature") != graph.signature():
+            return None
+        return cls(data["ids"], array('i', data["rank"]), array('q', data["offsets"]),
+                   array('i', data["targets"]), array('d', data["weights"]),
+                   array('i', data["mids"]), data.get("signature"))
+
+    @classmethod
+    def for_graph(cls, graph, path):
+        """Load the saved hierarchy for graph, or build and save a fresh one."""
+        ch = cls.load(path, graph)
+        if ch is None:
+            ch = cls.build(graph)
+            ch.save(path)
+        return ch
+
+    # ---------- Queries ----------
+    def _edge(self, a, b):
+        # upward edge between a and b lives with the lower-ranked endpoint
+        if self.rank[a] > self.rank[b]:
+            a, b = b, a
+        best = None
+        for e in range(self.offsets[a], self.offsets[a + 1]):
+            if self.targets[e] == b and (best is None or self.weights[e] < self.weights[best]):
+                best = e
+        return self.mids[best]
+
+    def _unpack(self, a, b, out):
+        # append the original nodes after a on the edge a-b (b included)
+        stack = [(a, b)]
+        while stack:
+            x, y = stack.pop()
+            mid = self._edge(x, y)
+            if mid == -1:
+                out.append(y)
+            else:
+                stack.append((mid, y))
+                stack.append((x, mid))
+
+    def query(self, source, target):
+        """(path as node ids, distance, settled nodes); ([], inf, n) if unreachable."""
+        s = self.index_of.get(source)
+        t = self.index_of.get(target)
+        if s is None or t is None:
+            return [], INF, 0
+        if s == t:
+            return [source], 0.0, 1
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        dist = ({s: 0.0}, {t: 0.0})
+        prev = ({s: -1}, {t: -1})
+        heaps = ([(0.0, s)], [(0.0, t)])
+        best, meet = INF, -1
+        settled = 0
+        side = 0
+        while heaps[0] or heaps[1]:
+            # a side whose frontier already reaches best is finished
+            if not heaps[side] or heaps[side][0][0] >= best:
+                side = 1 - side
+                if not heaps[side] or heaps[side][0][0] >= best:
+                    break
+            d, u = heapq.heappop(heaps[side])
+            if d > dist[side][u]:
+                side = 1 - side
+                continue
+            settled += 1
+            other = dist[1 - side].get(u)
+            if other is not None and d + other < best:
+                best, meet = d + other, u
+            for e in range(offsets[u], offsets[u + 1]):
+                v = targets[e]
+                alt = d + weights[e]
+                if alt < dist[side].get(v, INF):
+                    dist[side][v] = alt
+                    prev[side][v] = u
+                    heapq.heappush(heaps[side], (alt, v))
+            side = 1 - side
+        if meet == -1:
+            return [], INF, settled
+
+        up_path = []  # s .. meet in CH nodes
+        u = meet
+        while u != -1:
+            up_path.append(u)
+            u = prev[0][u]
+        up_path.reverse()
+        u = prev[1][meet]
+        while u != -1:
+            up_path.append(u)
+            u = prev[1][u]
+
+        nodes = [up_path[0]]
+        for a, b in zip(up_path, up_path[1:]):
+            self._unpack(a, b, nodes)
+        return [self.ids[i] for i in nodes], best, settled
+
+    def dijkstra(self, source, target):
+        """Shortest path as a list of node ids (same contract as CSRGraph.dijkstra)."""
+        return self.query(source, target)[0]
@@ -0,0 +1,166 @@
+# Compact, frozen CSR (compressed sparse row) form of structures.graph.Graph.
+import heapq
+from array import array
+from math import isnan, sqrt
+
+INF = float('inf')
+
+
+class CSRGraph:
+    """
+    Immutable array-backed snapshot of a Graph for fast routing.
+
+    Nodes are renumbered 0..V-1. The neighbours of node i are
+    neighbors[offsets[i]:offsets[i + 1]] with matching weights, all stored in
+    flat typed arrays (~12 bytes per directed edge instead of a tuple inside
+    a Python list). ids / index_of map between node ids and indices.
+
+    Searches keep their dist/prev state in dicts filled as nodes are
+    reached, so a query costs what it explores, not O(V).
+    """
+
+    def __init__(self, ids, offsets, neighbors, weights, lats, lons):
+        self.ids = ids                      # index -> node id
+        self.index_of = {node_id: i for i, node_id in enumerate(ids)}
+        self.offsets = offsets              # array('q'), len V + 1
+        self.neighbors = neighbors          # array('i'), len E
+        self.weights = weights              # array('d'), len E
+        self.lats = lats                    # array('d'), len V
+        self.lons = lons                    # array('d'), len V
+
+    @classmethod
+    def from_graph(cls, graph):
+        """Build a CSR snapshot; parallel edges collapse to the lightest one."""
+        ids = list(graph.adj)
+        index_of = {node_id: i for i, node_id in enumerate(ids)}
+        offsets = array('q', [0])
+        neighbors = array('i')
+        weights = array('d')
+        lats = array('d')
+        lons = array('d')
+        for node_id in ids:
+            best = {}
+            for v, w in graph.adj[node_id]:
+                j = index_of[v]
+                if w < best.get(j, INF):
+                    best[j] = w
+            for j, w in best.items():
+                neighbors.append(j)
+                weights.append(w)
+            offsets.append(len(neighbors))
+            # NaN marks a node without a position (no A* estimate for it)
+            lat, lon = graph.positions.get(node_id, (float('nan'), float('nan')))
+            lats.append(lat)
+            lons.append(lon)
+        return cls(ids, offsets, neighbors, weights, lats, lons)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def edge_count(self):
+        return len(self.neighbors)
+
+    def nbytes(self):
+        """Approximate size of the array storage in bytes."""
+        arrays = (self.offsets, self.neighbors, self.weights, self.lats, self.lons)
+        return sum(a.itemsize * len(a) for a in arrays)
+
+    def _path(self, prev, target):
+        path = []
+        u = target
+        while u != -1:
+            path.append(self.ids[u])
+            u = prev[u]
+        path.reverse()
+        return path
+
+    def dijkstra(self, source, target):
+        """
+        Shortest path from source to target as a list of node ids (same
+        contract as Graph.dijkstra); [] if either node is missing or the
+        target cannot be reached.
+        """
+        return self.search(source, target)[0]
+
+    def search(self, source, target, scale=0.0):
+        """
+        (path, distance, settled) from source to target: Dijkstra, or A*
+        with scale * straight-line distance as the estimate when scale > 0
+        (scale must keep it a lower bound, see Graph._heuristic_scale).
+        ([], inf, settled) if either node is missing or unreachable.
+        """
+        s = self.index_of.get(source)
+        t = self.index_of.get(target)
+        if s is None or t is None:
+            return [], INF, 0
+        offsets, neighbors, weights = self.offsets, self.neighbors, self.weights
+        lats, lons = self.lats, self.lons
+        tlat, tlon = lats[t], lons[t]
+        if isnan(tlat):
+            scale = 0.0
+
+        def h(v):
+            if not scale or isnan(lats[v]):
+                return 0.0
+            return scale * sqrt((lats[v] - tlat) ** 2 + (lons[v] - tlon) ** 2)
+
+        dist = {s: 0.0}
+        prev = {s: -1}
+        settled = 0
+        heap = [(h(s), 0.0, s)]
+        while heap:
+            _, d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            settled += 1
+            if u == t:
+                return self._path(prev, t), d, settled
+            for e in range(offsets[u], offsets[u + 1]):
+                v = neighbors[e]
+                alt = d + weights[e]
+                if alt < dist.get(v, INF):
+                    dist[v] = alt
+                    prev[v] = u
+                    heapq.heappush(heap, (alt + h(v), alt, v))
+        return [], INF, settled
+
+    def one_to_many(self, source, targets):
+        """
+        Shortest distances from source to each of targets (node ids), in
+        order; inf where unreachable. One search that stops as soon as every
+        target is settled.
+        """
+        out = [INF] * len(targets)
+        s = self.index_of.get(source)
+        if s is None:
+            return out
+        wanted = {}
+        for k, node_id in enumerate(targets):
+            t = self.index_of.get(node_id)
+            if t is not None:
+                wanted.setdefault(t, []).append(k)
+        remaining = len(wanted)
+        if not remaining:
+            return out
+        offsets, neighbors, weights = self.offsets, self.neighbors, self.weights
+        dist = {s: 0.0}
+        heap = [(0.0, s)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            slots = wanted.get(u)
+            if slots is not None:
+                for k in slots:
+                    out[k] = d
+                remaining -= 1
+                if not remaining:
+                    break
+            for e in range(offsets[u], offsets[u + 1]):
+                v = neighbors[e]
+                alt = d + weights[e]
+                if alt < dist.get(v, INF):
+                    dist[v] = alt
+                    heapq.heappush(heap, (alt, v))
+        return out
@@ -0,0 +1,54 @@
+# Dense sources x targets matrix of road distances stored as float32.
+from array import array
+
+
+class DistanceMatrix:
+    """
+    Row-major float32 matrix: values[i * len(targets) + j] is the distance
+    from sources[i] to targets[j] (inf if unreachable). 4 bytes per cell, so
+    a 2,000 x 2,000 matrix takes 16 MB.
+    """
+
+    def __init__(self, sources, targets, values=None):
+        self.sources = list(sources)
+        self.targets = list(targets)
+        self._row = {node_id: i for i, node_id in enumerate(self.sources)}
+        self._col = {node_id: j for j, node_id in enumerate(self.targets)}
+        size = len(self.sources) * len(self.targets)
+        if values is None:
+            values = array('f', [0.0]) * size
+        if len(values) != size:
+            raise ValueError(f"Expected {size} distances, got {len(values)}")
+        self.values = values
+
+    @property
+    def shape(self):
+        return len(self.sources), len(self.targets)
+
+    def get(self, source, target):
+        return self.values[self._row[source] * len(self.targets) + self._col[target]]
+
+    def __getitem__(self, pair):
+        return self.get(*pair)
+
+    def row(self, source):
+        """Distances from source to every target, in target order."""
+        start = self._row[source] * len(self.targets)
+        return self.values[start:start + len(self.targets)]
+
+    def set_row(self, i, distances):
+        start = i * len(self.targets)
+        self.values[start:start + len(self.targets)] = array('f', distances)
+
+    def nbytes(self):
+        return self.values.itemsize * len(self.values)
+
+    # ---------- Persistence (raw float32, shape comes from the caller) ----------
+    def to_bytes(self):
+        return self.values.tobytes()
+
+    @classmethod
+    def from_bytes(cls, sources, targets, data):
+        values = array('f')
+        values.frombytes(data)
+        return cls(sources, targets, values)
@@ -1,6 +1,40 @@
-# Graph implemented as adjacency list with Dijkstra (weights positive).
+# Graph implemented as adjacency list with Dijkstra, A* and bidirectional search (weights positive).
+import hashlib
 import heapq
+from array import array
+from collections import namedtuple
 from math import sqrt
+from structures.csr_graph import CSRGraph
+from structures.union_find import UnionFind
+
+INF = float('inf')
+
+# path: list of node ids; distance: total weight; settled: nodes finalized
+class PathResult(namedtuple("PathResult", ["path", "distance", "settled"])):
+    __slots__ = ()
+
+    @property
+    def found(self):
+        """False for the "no route" result (empty path, infinite distance)."""
+        return bool(self.path)
+
+
+# Returned when source and target are in different components (or missing)
+NO_ROUTE = PathResult([], INF, 0)
+
+# Shortest-path forest grown from several sources at once:
+# dist: node -> distance to its nearest source, nearest: node -> that source,
+# prev: node -> next node on the way back to the source (None at a source)
+SourceTree = namedtuple("SourceTree", ["dist", "nearest", "prev"])
+
+# Time-dependent routing: speeds per 15-minute bucket over a week (Mon 00:00
+# = minute 0); path: node ids, minutes: travel time, settled: nodes finalized
+BUCKET_MINUTES = 15
+BUCKETS_PER_WEEK = 7 * 24 * 60 // BUCKET_MINUTES  # 672
+MINUTES_PER_WEEK = BUCKETS_PER_WEEK * BUCKET_MINUTES
+FREE_FLOW_KMH = 50.0
+BOUND_WINDOW = 8  # buckets covered by each per-bucket speed bound (2 hours)
+TimedPath = namedtuple("TimedPath", ["path", "minutes", "settled"])
 
 
 class Graph:
@@ -8,11 +42,45 @@ class Graph:
         # adjacency: node_id -> list of (neighbor_id, weight)
         self.adj = {}
         self.positions = {}  # node_id -> (lat, lon)
+        # bumped on every structural change so derived data can be invalidated
+        self.version = 0
+        self._frozen = None  # (version, CSRGraph)
+        self._scale = None   # (version, A* heuristic scale)
+        self._trees = {}     # frozenset(sources) -> (version, SourceTree)
+        self._signature = None  # (version, fingerprint)
+        # speed profiles: profile p occupies _speeds[p*672:(p+1)*672] (km/h);
+        # edges without an entry in _edge_profile use profile 0
+        self._speeds = array('f', [FREE_FLOW_KMH]) * BUCKETS_PER_WEEK
+        self._edge_profile = {}  # (a, b) -> profile id, stored both ways
+        self._speed_bounds = None  # (max speed over all, array per bucket)
+        # connected components, kept current on insertion; removals can
+        # split a component, so they only mark it stale for a lazy rebuild
+        self._components = UnionFind()
+        self._components_stale = False
 
     def add_node(self, node_id, lat, lon):
         if node_id not in self.adj:
             self.adj[node_id] = []
+            self._components.add(node_id)
         self.positions[node_id] = (lat, lon)
+        self.version += 1
+
+    def remove_node(self, node_id):
+        """Remove a node and all its incident edges. O(sum of neighbour degrees)."""
+        if node_id not in self.adj:
+            return False
+        for v in {v for v, _ in self.adj[node_id]}:
+            if v != node_id:
+                self.adj[v] = [(n, w) for n, w in self.adj[v] if n != node_id]
+        if self._edge_profile:
+            for v, _ in self.adj[node_id]:
+                self._edge_profile.pop((node_id, v), None)
+                self._edge_profile.pop((v, node_id), None)
+        del self.adj[node_id]
+        self.positions.pop(node_id, None)
+        self._components_stale = True
+        self.version += 1
+        return True
 
     def add_edge(self, a, b, weight=None):
         if a not in self.adj or b not in self.adj:
@@ -21,39 +89,351 @@ class Graph:
             weight = self._euclidean_distance(a, b)
         self.adj[a].append((b, weight))
         self.adj[b].append((a, weight))
+        if not self._components_stale:
+            self._components.union(a, b)
+        self.version += 1
+
+    def remove_edge(self, a, b):
+        """Remove every edge between a and b."""
+        if a not in self.adj or b not in self.adj:
+            return False
+        self.adj[a] = [(n, w) for n, w in self.adj[a] if n != b]
+        self.adj[b] = [(n, w) for n, w in self.adj[b] if n != a]
+        self._edge_profile.pop((a, b), None)
+        self._edge_profile.pop((b, a), None)
+        self._components_stale = True
+        self.version += 1
+        return True
 
     def _euclidean_distance(self, a, b):
         (la, lo) = self.positions[a]
         (lb, lo2) = self.positions[b]
         return sqrt((la - lb)**2 + (lo - lo2)**2)
 
+    # ---------- Connectivity ----------
+    def _component_index(self):
+        if self._components_stale:
+            components = UnionFind()
+            for u, edges in self.adj.items():
+                components.add(u)
+                for v, _ in edges:
+                    components.add(v)
+                    components.union(u, v)
+            self._components = components
+            self._components_stale = False
+        return self._components
+
+    def connected(self, a, b):
+        """True if a route exists between a and b. ~O(α(n)) unless rebuilding after a removal."""
+        return self._component_index().connected(a, b)
+
+    def component_count(self):
+        return self._component_index().count()
+
+    # ---------- Shortest paths ----------
+    # Search state (dist/prev) is kept in dicts populated lazily as nodes are
+    # reached, so a query only pays for the part of the graph it explores.
+    # Dijkstra and A* run on the CSR snapshot from freeze(), which is built
+    # once per graph version and reused by every query until the next edit.
+
     def dijkstra(self, source, target):
-        if source not in self.adj or target not in self.adj:
-            return []
-        dist = {node: float('inf') for node in self.adj}
-        prev = {node: None for node in self.adj}
-        dist[source] = 0
-        heap = [(0, source)]
+        return self.shortest_path(source, target).path  # list of node ids, [] if no route
+
+    def shortest_path(self, source, target, method="dijkstra"):
+        """
+        Shortest path from source to target.
+
+        method: "dijkstra", "astar" (straight-line heuristic over positions)
+        or "bidirectional". Returns a PathResult(path, distance, settled),
+        where settled is the number of nodes the search finalized, or
+        NO_ROUTE straight away if the two nodes are not connected.
+        """
+        if not self.connected(source, target):
+            return NO_ROUTE
+        if method == "astar":
+            return self._astar(source, target)
+        if method == "bidirectional":
+            return self._bidirectional(source, target)
+        if method == "dijkstra":
+            return self._dijkstra(source, target)
+        raise ValueError(f"Unknown shortest path method: {method}")
+
+    @staticmethod
+    def _walk(prev, node):
+        path = []
+        while node is not None:
+            path.append(node)
+            node = prev.get(node)
+        path.reverse()
+        return path
+
+    def _dijkstra(self, source, target):
+        return PathResult(*self.freeze().search(source, target))
+
+    def _heuristic_scale(self):
+        """
+        Largest factor c with c * straight_line(u, v) <= weight(u, v) on every
+        edge. c * straight_line(node, target) then never overestimates the
+        remaining distance (admissible and consistent) whatever unit the
+        weights are in. Cached per graph version.
+        """
+        if self._scale is not None and self._scale[0] == self.version:
+            return self._scale[1]
+        scale = INF
+        for u, edges in self.adj.items():
+            pu = self.positions.get(u)
+            for v, w in edges:
+                pv = self.positions.get(v)
+                if pu is None or pv is None:
+                    continue
+                d = sqrt((pu[0] - pv[0]) ** 2 + (pu[1] - pv[1]) ** 2)
+                if d > 0:
+                    scale = min(scale, w / d)
+        if scale == INF:
+            scale = 0.0
+        self._scale = (self.version, scale)
+        return scale
+
+    def _astar(self, source, target):
+        return PathResult(*self.freeze().search(source, target, self._heuristic_scale()))
+
+    def _bidirectional(self, source, target):
+        # Edges are stored in both directions, so the backward search can use
+        # the same adjacency lists.
+        dist = ({source: 0}, {target: 0})
+        prev = ({source: None}, {target: None})
+        heaps = ([(0, source)], [(0, target)])
+        done = (set(), set())
+        best, meet = INF, None
+        settled = 0
+        if source == target:
+            return PathResult([source], 0, 1)
+        while heaps[0] and heaps[1]:
+            # stop once no shorter connection can still be found
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            d, u = heapq.heappop(heaps[side])
+            if u in done[side] or d > dist[side][u]:
+                continue
+            done[side].add(u)
+            settled += 1
+            other = dist[1 - side]
+            for v, w in self.adj[u]:
+                alt = d + w
+                if alt < dist[side].get(v, INF):
+                    dist[side][v] = alt
+                    prev[side][v] = u
+                    heapq.heappush(heaps[side], (alt, v))
+                if v in other and dist[side][v] + other[v] < best:
+                    best, meet = dist[side][v] + other[v], v
+        if meet is None:
+            return NO_ROUTE
+        forward = self._walk(prev[0], meet)
+        backward = self._walk(prev[1], meet)
+        backward.reverse()
+        return PathResult(forward + backward[1:], best, settled)
+
+    def multi_source_dijkstra(self, sources):
+        """
+        One Dijkstra pass seeded from every source: for each reachable node,
+        its nearest source by path weight, the distance and the predecessor
+        towards it. O(E log V) regardless of the number of sources.
+        """
+        dist, nearest, prev = {}, {}, {}
+        heap = []
+        for s in sources:
+            if s in self.adj and s not in dist:
+                dist[s] = 0
+                nearest[s] = s
+                prev[s] = None
+                heap.append((0, s))
+        heapq.heapify(heap)
         while heap:
             d, u = heapq.heappop(heap)
-            if u == target:
-                break
             if d > dist[u]:
                 continue
             for v, w in self.adj[u]:
-                alt = dist[u] + w
-                if alt < dist[v]:
+                alt = d + w
+                if alt < dist.get(v, INF):
                     dist[v] = alt
+                    nearest[v] = nearest[u]
                     prev[v] = u
                     heapq.heappush(heap, (alt, v))
-        # rebuild path
+        return SourceTree(dist, nearest, prev)
+
+    def source_tree(self, sources):
+        """multi_source_dijkstra(sources), cached until the graph changes."""
+        key = frozenset(sources)
+        cached = self._trees.get(key)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        tree = self.multi_source_dijkstra(key)
+        # only the current version is worth keeping
+        self._trees = {k: v for k, v in self._trees.items() if v[0] == self.version}
+        self._trees[key] = (self.version, tree)
+        return tree
+
+    def path_to_nearest(self, node_id, sources):
+        """
+        PathResult from node_id to its nearest source (path starts at node_id
+        and ends at the source); empty path if no source is reachable.
+        settled is the number of nodes walked, the tree itself is cached.
+        """
+        tree = self.source_tree(sources)
+        if node_id not in tree.dist:
+            return NO_ROUTE
         path = []
-        u = target
-        while u is not None:
-            path.append(u)
-            u = prev[u]
-        path.reverse()
-        return path  # list of node ids
+        node = node_id
+        while node is not None:
+            path.append(node)
+            node = tree.prev[node]
+        return PathResult(path, tree.dist[node_id], len(path))
+
+    # ---------- Time-dependent travel times ----------
+    # Edge weights are kilometres; a speed profile gives km/h for each of the
+    # week's 672 fifteen-minute buckets. Profiles live in one flat float32
+    # array and edges only store a profile id, so thousands of edges can
+    # share a handful of traffic patterns.
+
+    def add_speed_profile(self, speeds):
+        """
+        Register a profile and return its id. speeds holds 672 weekly values,
+        96 daily values (repeated for every day) or a single constant speed.
+        """
+        speeds = list(speeds)
+        if len(speeds) == 1:
+            speeds = speeds * BUCKETS_PER_WEEK
+        elif len(speeds) == BUCKETS_PER_WEEK // 7:
+            speeds = speeds * 7
+        if len(speeds) != BUCKETS_PER_WEEK:
+            raise ValueError(f"Speed profile needs 1, 96 or {BUCKETS_PER_WEEK} values, got {len(speeds)}")
+        if min(speeds) <= 0:
+            raise ValueError("Speeds must be positive")
+        self._speeds.extend(array('f', speeds))
+        self._speed_bounds = None
+        return len(self._speeds) // BUCKETS_PER_WEEK - 1
+
+    def set_default_profile(self, speeds):
+        """Replace profile 0, used by every edge without its own profile."""
+        pid = self.add_speed_profile(speeds)
+        start = pid * BUCKETS_PER_WEEK
+        self._speeds[:BUCKETS_PER_WEEK] = self._speeds[start:]
+        del self._speeds[start:]
+        self._speed_bounds = None
+
+    def set_edge_profile(self, a, b, profile_id):
+        if not 0 <= profile_id < len(self._speeds) // BUCKETS_PER_WEEK:
+            raise ValueError(f"Unknown speed profile {profile_id}")
+        self._edge_profile[(a, b)] = profile_id
+        self._edge_profile[(b, a)] = profile_id
+
+    def speed(self, a, b, minute):
+        """Speed (km/h) on edge a-b at a minute of the week."""
+        bucket = int(minute // BUCKET_MINUTES) % BUCKETS_PER_WEEK
+        return self._speeds[self._edge_profile.get((a, b), 0) * BUCKETS_PER_WEEK + bucket]
+
+    def travel_minutes(self, a, b, km, depart):
+        """
+        Minutes to drive km along edge a-b leaving at minute depart. The speed
+        changes at bucket boundaries while driving, so leaving later never
+        means arriving earlier (FIFO), which the searches below rely on.
+        """
+        base = self._edge_profile.get((a, b), 0) * BUCKETS_PER_WEEK
+        speeds = self._speeds
+        t = depart
+        remaining = km
+        while True:
+            bucket_start = (t // BUCKET_MINUTES) * BUCKET_MINUTES
+            speed = speeds[base + int(bucket_start // BUCKET_MINUTES) % BUCKETS_PER_WEEK]
+            left = bucket_start + BUCKET_MINUTES - t
+            reach = speed * left / 60
+            if remaining <= reach:
+                return t + remaining / speed * 60 - depart
+            remaining -= reach
+            t += left
+
+    def _bounds(self):
+        # (fastest speed anywhere, fastest speed in each bucket's BOUND_WINDOW)
+        if self._speed_bounds is None:
+            speeds = self._speeds
+            per_bucket = array('f', [max(speeds[b::BUCKETS_PER_WEEK]) for b in range(BUCKETS_PER_WEEK)])
+            window = array('f', [
+                max(per_bucket[(b + k) % BUCKETS_PER_WEEK] for k in range(BOUND_WINDOW))
+                for b in range(BUCKETS_PER_WEEK)])
+            self._speed_bounds = (max(per_bucket), window)
+        return self._speed_bounds
+
+    def fastest_route(self, source, target, depart, method="astar"):
+        """
+        Fastest route leaving source at minute depart (minute of the week,
+        Monday 00:00 = 0). method "dijkstra" or "astar". Returns a TimedPath;
+        empty path and inf minutes if target is unreachable.
+
+        The A* bound is the straight-line lower bound on kilometres divided
+        by the fastest speed possible: either the precomputed maximum over
+        the next BOUND_WINDOW buckets (valid while the rest of the trip fits
+        in that window) or the global maximum. It never overestimates, so
+        results match time-dependent Dijkstra.
+        """
+        if not self.connected(source, target):
+            return TimedPath([], INF, 0)
+        if method not in ("dijkstra", "astar"):
+            raise ValueError(f"Unknown fastest route method: {method}")
+        vmax, window = self._bounds()
+        scale = self._heuristic_scale() if method == "astar" else 0.0
+        tpos = self.positions.get(target)
+
+        def h(node, t):
+            pos = self.positions.get(node)
+            if not scale or pos is None or tpos is None:
+                return 0.0
+            km = scale * sqrt((pos[0] - tpos[0]) ** 2 + (pos[1] - tpos[1]) ** 2)
+            bound = km / vmax * 60
+            bucket = int(t // BUCKET_MINUTES)
+            # minutes until the bound window starting at this bucket ends
+            horizon = (bucket + BOUND_WINDOW) * BUCKET_MINUTES - t
+            return max(bound, min(km / window[bucket % BUCKETS_PER_WEEK] * 60, horizon))
+
+        arrival = {source: depart}
+        prev = {source: None}
+        settled = 0
+        heap = [(depart + h(source, depart), depart, source)]
+        while heap:
+            _, t, u = heapq.heappop(heap)
+            if t > arrival[u]:
+                continue
+            settled += 1
+            if u == target:
+                return TimedPath(self._walk(prev, target), t - depart, settled)
+            for v, km in self.adj[u]:
+                at = t + self.travel_minutes(u, v, km, t)
+                if at < arrival.get(v, INF):
+                    arrival[v] = at
+                    prev[v] = u
+                    heapq.heappush(heap, (at + h(v, at), at, v))
+        return TimedPath([], INF, settled)
 
     def get_node_pos(self, node_id):
         return self.positions.get(node_id)
+
+    def signature(self):
+        """
+        Fingerprint of nodes, positions and edges, independent of insertion
+        order. Unlike version it is stable across restarts, so it can tell
+        whether something saved to disk was derived from this same network.
+        """
+        if self._signature is None or self._signature[0] != self.version:
+            h = hashlib.sha1()
+            for node_id in sorted(self.adj, key=repr):
+                lat, lon = self.positions.get(node_id, (0.0, 0.0))
+                edges = sorted((repr(v), w) for v, w in self.adj[node_id])
+                h.update(repr((node_id, lat, lon, edges)).encode("utf-8"))
+            self._signature = (self.version, h.hexdigest())
+        return self._signature[1]
+
+    def freeze(self):
+        """Compact CSR snapshot of the current graph (rebuilt only after changes)."""
+        if self._frozen is None or self._frozen[0] != self.version:
+            self._frozen = (self.version, CSRGraph.from_graph(self))
+        return self._frozen[1]
@@ -1,13 +1,33 @@
 class HashMap:
-    """Simple separate-chaining hash map"""
+    """
+    Separate-chaining hash map that resizes to keep chains short.
+
+    The table doubles when the load factor passes MAX_LOAD and halves when it
+    drops below MIN_LOAD (never below the initial capacity), so get/set/remove
+    stay O(1) on average however many bins are registered. The item count is
+    tracked, so len() is O(1) as well.
+    """
+
+    MAX_LOAD = 0.75
+    MIN_LOAD = 0.2
 
     def __init__(self, capacity=101):
+        self.initial_capacity = capacity
         self.capacity = capacity
         self.buckets = [[] for _ in range(capacity)]
+        self.size = 0
 
     def _bucket_index(self, key):
         return hash(key) % self.capacity
 
+    def _resize(self, new_capacity):
+        old_buckets = self.buckets
+        self.capacity = new_capacity
+        self.buckets = [[] for _ in range(new_capacity)]
+        for bucket in old_buckets:
+            for k, v in bucket:
+                self.buckets[self._bucket_index(k)].append((k, v))
+
     def set(self, key, value):
         i = self._bucket_index(key)
         for idx, (k, v) in enumerate(self.buckets[i]):
@@ -15,6 +35,9 @@ class HashMap:
                 self.buckets[i][idx] = (key, value)
                 return
         self.buckets[i].append((key, value))
+        self.size += 1
+        if self.size > self.capacity * self.MAX_LOAD:
+            self._resize(self.capacity * 2)
 
     def get(self, key, default=None):
         i = self._bucket_index(key)
@@ -28,6 +51,10 @@ class HashMap:
         for idx, (k, _) in enumerate(self.buckets[i]):
             if k == key:
                 del self.buckets[i][idx]
+                self.size -= 1
+                if (self.capacity > self.initial_capacity
+                        and self.size < self.capacity * self.MIN_LOAD):
+                    self._resize(max(self.initial_capacity, self.capacity // 2))
                 return True
         return False
 
@@ -35,19 +62,19 @@ class HashMap:
         for bucket in self.buckets:
             for k, _ in bucket:
                 yield k
-    
+
     def values(self):
         """Yield all values in the hash map."""
         for bucket in self.buckets:
             for _, v in bucket:
                 yield v
-    
+
     def items(self):
         """Yield all (key, value) pairs in the hash map."""
         for bucket in self.buckets:
             for k, v in bucket:
                 yield (k, v)
-    
+
     def contains(self, key):
         """Check if key exists in the hash map."""
         i = self._bucket_index(key)
@@ -55,10 +82,27 @@ class HashMap:
             if k == key:
                 return True
         return False
-    
+
+    def __contains__(self, key):
+        return self.contains(key)
+
+    def __getitem__(self, key):
+        i = self._bucket_index(key)
+        for k, v in self.buckets[i]:
+            if k == key:
+                return v
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        if not self.remove(key):
+            raise KeyError(key)
+
+    def __iter__(self):
+        return self.keys()
+
     def __len__(self):
         """Return the number of items in the hash map."""
-        count = 0
-        for bucket in self.buckets:
-            count += len(bucket)
-        return count
+        return self.size
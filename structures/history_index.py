@@ -0,0 +1,182 @@
+# Posting-list index over history records for filtered, paged queries.
+import heapq
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import islice
+
+# Records are grouped by the fields the history view filters on; every
+# group keeps the sequence numbers of its records in ascending order.
+HistoryKey = namedtuple("HistoryKey", ["bin_id", "area", "status", "type"])
+# Result of HistoryIndex.select: the matching groups as (HistoryKey,
+# postings) pairs, and the posting lists that together hold exactly the
+# matching records (fewer, longer lists when only status/type filter)
+HistorySelection = namedtuple("HistorySelection", ["groups", "postings"])
+
+
+def _key(record):
+    return HistoryKey(str(record.get("bin_id", "")), record.get("area", ""),
+                      record.get("status"), record.get("type"))
+
+
+class HistoryIndex:
+    """
+    Indexes history records by status, waste type, bin ID and area.
+
+    Each record gets a sequence number in history order and is listed in
+    the posting list of its (bin_id, area, status, type) group and in the
+    posting list of its (status, type). Status and bin lookups map to their
+    groups, so a query only touches what it selects: counts are sums of
+    list lengths and a page is a k-way merge that stops after offset + limit
+    records. Appends and removals update two posting lists each.
+
+    Filled by rebuild() once history is loaded; add() before that is
+    ignored, as rebuild() picks the record up from the list.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.ready = False
+        self._next_seq = 0
+        self._records = {}    # seq -> record
+        self._seq_of = {}     # id(record) -> seq
+        self._groups = {}     # HistoryKey -> [seq, ...] ascending
+        self._by_status_type = {}  # (status, type) -> [seq, ...] ascending
+        self._by_status = {}  # status -> set of HistoryKey
+        self._by_bin = {}     # bin_id -> set of HistoryKey
+        self._bin_lower = {}  # bin_id -> lower-cased bin_id, for substring search
+
+    def rebuild(self, history):
+        """Index every record of history (in list order) and start tracking appends."""
+        with self._lock:
+            self._next_seq = 0
+            self._records.clear()
+            self._seq_of.clear()
+            self._groups.clear()
+            self._by_status_type.clear()
+            self._by_status.clear()
+            self._by_bin.clear()
+            self._bin_lower.clear()
+            for record in list(history):
+                self._add(record)
+            self.ready = True
+
+    def add(self, record):
+        with self._lock:
+            if self.ready and id(record) not in self._seq_of:
+                self._add(record)
+
+    def _add(self, record):
+        seq = self._next_seq
+        self._next_seq += 1
+        self._records[seq] = record
+        self._seq_of[id(record)] = seq
+        key = _key(record)
+        postings = self._groups.get(key)
+        if postings is None:
+            postings = self._groups[key] = []
+            self._by_status.setdefault(key.status, set()).add(key)
+            self._by_bin.setdefault(key.bin_id, set()).add(key)
+            self._bin_lower.setdefault(key.bin_id, key.bin_id.lower())
+        postings.append(seq)  # seqs only grow, so the lists stay sorted
+        self._by_status_type.setdefault((key.status, key.type), []).append(seq)
+
+    def remove(self, record):
+        with self._lock:
+            seq = self._seq_of.pop(id(record), None)
+            if seq is None:
+                return
+            del self._records[seq]
+            key = _key(record)
+            postings = self._groups[key]
+            del postings[bisect_left(postings, seq)]
+            postings_st = self._by_status_type[(key.status, key.type)]
+            del postings_st[bisect_left(postings_st, seq)]
+            if not postings:
+                del self._groups[key]
+                self._by_status[key.status].discard(key)
+                self._by_bin[key.bin_id].discard(key)
+                if not self._by_bin[key.bin_id]:
+                    del self._by_bin[key.bin_id]
+                    del self._bin_lower[key.bin_id]
+
+    def __len__(self):
+        return len(self._records)
+
+    def count(self, status=None, waste_type=None):
+        """Number of records with status and waste_type (None matches any). O(statuses x types)."""
+        with self._lock:
+            return sum(len(p) for (s, t), p in self._by_status_type.items()
+                       if (status is None or s == status) and (waste_type is None or t == waste_type))
+
+    def select(self, status=None, waste_type=None, bin_query="", area_query=""):
+        """
+        HistorySelection of the records matching the filters: status (a
+        value or a list of values), waste_type, and case-insensitive
+        substrings of the bin ID and area. Posting lists are shared with the
+        index; treat them as read-only.
+        """
+        statuses = None if status is None else (
+            {status} if isinstance(status, str) else set(status))
+        bin_query = bin_query.strip().lower()
+        area_query = area_query.strip().lower()
+        with self._lock:
+            if bin_query:
+                keys = [key for bin_id, lower in self._bin_lower.items() if bin_query in lower
+                        for key in self._by_bin[bin_id]]
+            elif statuses is not None:
+                keys = [key for s in statuses for key in self._by_status.get(s, ())]
+            else:
+                keys = list(self._groups)
+            area_match = {}
+            out = []
+            for key in keys:
+                if statuses is not None and key.status not in statuses:
+                    continue
+                if waste_type is not None and key.type != waste_type:
+                    continue
+                if area_query:
+                    hit = area_match.get(key.area)
+                    if hit is None:
+                        hit = area_match[key.area] = area_query in str(key.area).lower()
+                    if not hit:
+                        continue
+                out.append((key, self._groups[key]))
+            if bin_query or area_query:
+                return HistorySelection(out, [postings for _, postings in out])
+            postings = [p for (s, t), p in self._by_status_type.items()
+                        if (statuses is None or s in statuses) and (waste_type is None or t == waste_type)]
+            return HistorySelection(out, postings)
+
+    def page(self, selection, offset=0, limit=10, order_by=None, reverse=False, newest_first=True):
+        """
+        Records offset..offset + limit of a selection. Without
+        order_by they come in history order (newest first by default). With
+        order_by(key), groups are ordered by that key (descending if reverse)
+        and records of equal keys are merged in history order.
+        """
+        with self._lock:
+            if order_by is None:
+                buckets = [selection.postings]
+            else:
+                by_key = {}
+                for key, postings in selection.groups:
+                    by_key.setdefault(order_by(key), []).append(postings)
+                buckets = [by_key[k] for k in sorted(by_key, reverse=reverse)]
+            out = []
+            skip = offset
+            for lists in buckets:
+                size = sum(len(p) for p in lists)
+                if skip >= size:
+                    skip -= size
+                    continue
+                if newest_first:
+                    merged = heapq.merge(*(reversed(p) for p in lists), reverse=True)
+                else:
+                    merged = heapq.merge(*lists)
+                for seq in islice(merged, skip, skip + limit - len(out)):
+                    out.append(self._records[seq])
+                skip = 0
+                if len(out) >= limit:
+                    break
+            return out
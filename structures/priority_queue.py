@@ -35,3 +35,139 @@ class PriorityQueue:
     def top_k(self, k=5):
         # Return top k most urgent bins
         return [bin for _, _, bin in heapq.nlargest(k, self.heap)]
+
+
+class IndexedPriorityQueue:
+    """
+    Max-heap keyed by id (e.g. bin id -> fill level) that supports changing
+    or removing an entry's priority in O(log n) instead of rebuilding.
+    Equal priorities pop in insertion order.
+    """
+
+    def __init__(self):
+        self.heap = []  # entries: [priority, counter, key, item]
+        self.pos = {}   # key -> index in heap
+        self._counter = 0
+
+    def _higher(self, i, j):
+        a, b = self.heap[i], self.heap[j]
+        return a[0] > b[0] or (a[0] == b[0] and a[1] < b[1])
+
+    def _swap(self, i, j):
+        self.heap[i], self.heap[j] = self.heap[j], self.heap[i]
+        self.pos[self.heap[i][2]] = i
+        self.pos[self.heap[j][2]] = j
+
+    def _sift_up(self, i):
+        while i > 0:
+            parent = (i - 1) // 2
+            if not self._higher(i, parent):
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i):
+        n = len(self.heap)
+        while True:
+            best = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < n and self._higher(child, best):
+                    best = child
+            if best == i:
+                break
+            self._swap(i, best)
+            i = best
+
+    def push(self, key, priority, item=None):
+        """Insert key, or update it if already present."""
+        if key in self.pos:
+            self.update(key, priority, item)
+            return
+        self.heap.append([priority, self._counter, key, item])
+        self._counter += 1
+        self.pos[key] = len(self.heap) - 1
+        self._sift_up(len(self.heap) - 1)
+
+    def update(self, key, priority, item=None):
+        """Change the priority of key (inserting it if missing)."""
+        i = self.pos.get(key)
+        if i is None:
+            self.push(key, priority, item)
+            return
+        entry = self.heap[i]
+        old = entry[0]
+        entry[0] = priority
+        if item is not None:
+            entry[3] = item
+        if priority > old:
+            self._sift_up(i)
+        elif priority < old:
+            self._sift_down(i)
+
+    def remove(self, key):
+        """Remove key; returns its item, or None if it was not queued."""
+        i = self.pos.pop(key, None)
+        if i is None:
+            return None
+        entry = self.heap[i]
+        last = self.heap.pop()
+        if i < len(self.heap):
+            self.heap[i] = last
+            self.pos[last[2]] = i
+            self._sift_up(i)
+            self._sift_down(self.pos[last[2]])
+        return entry[3]
+
+    def pop(self):
+        if not self.heap:
+            return None
+        return self.remove(self.heap[0][2])
+
+    def peek(self):
+        return self.heap[0][3] if self.heap else None
+
+    def priority(self, key):
+        i = self.pos.get(key)
+        return self.heap[i][0] if i is not None else None
+
+    def contains(self, key):
+        return key in self.pos
+
+    def __contains__(self, key):
+        return key in self.pos
+
+    def __len__(self):
+        return len(self.heap)
+
+    def items_at_least(self, threshold):
+        """
+        Items with priority >= threshold, highest first, without popping.
+        Walks the heap with a side frontier: O(k log k) for k results.
+        """
+        out = []
+        if not self.heap or self.heap[0][0] < threshold:
+            return out
+        frontier = [(-self.heap[0][0], self.heap[0][1], 0)]
+        while frontier:
+            _, _, i = heapq.heappop(frontier)
+            out.append(self.heap[i][3])
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(self.heap) and self.heap[child][0] >= threshold:
+                    entry = self.heap[child]
+                    heapq.heappush(frontier, (-entry[0], entry[1], child))
+        return out
+
+    def top_k(self, k=5):
+        """The k highest-priority items, highest first, without popping."""
+        out = []
+        if not self.heap:
+            return out
+        frontier = [(-self.heap[0][0], self.heap[0][1], 0)]
+        while frontier and len(out) < k:
+            _, _, i = heapq.heappop(frontier)
+            out.append(self.heap[i][3])
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(self.heap):
+                    entry = self.heap[child]
+                    heapq.heappush(frontier, (-entry[0], entry[1], child))
+        return out
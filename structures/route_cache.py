@@ -0,0 +1,79 @@
+# LRU cache of shortest-path results for a Graph.
+import weakref
+from collections import OrderedDict
+
+
+class RouteCache:
+    """
+    Caches Graph.shortest_path results keyed by (source, target, method,
+    graph.version) for one graph object. Any structural change bumps the
+    graph version, and a rebuilt graph starts counting from 0 again, so the
+    cache is cleared whenever either the graph or its version changes;
+    stale routes are never returned.
+
+    Memory is bounded two ways: at most max_entries routes and at most
+    max_nodes path nodes in total (long routes cost more than short ones).
+    Least recently used routes are evicted first.
+    """
+
+    def __init__(self, max_entries=1024, max_nodes=200_000):
+        self.max_entries = max_entries
+        self.max_nodes = max_nodes
+        self._routes = OrderedDict()  # key -> PathResult
+        self._nodes = 0
+        self._graph = None  # weakref to the graph the routes belong to
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, graph, source, target, method="dijkstra"):
+        """Return graph.shortest_path(source, target, method), cached."""
+        # compared by identity: a rebuilt graph may reach the same version
+        if self._graph is None or self._graph() is not graph or graph.version != self._version:
+            if self._routes:
+                self.invalidations += 1
+            self.clear()
+            self._graph = weakref.ref(graph)
+            self._version = graph.version
+        key = (source, target, method, graph.version)
+        result = self._routes.get(key)
+        if result is not None:
+            self._routes.move_to_end(key)
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = graph.shortest_path(source, target, method)
+        self._routes[key] = result
+        self._nodes += len(result.path)
+        self._evict()
+        return result
+
+    def _evict(self):
+        # always keep the newest entry, even if it alone exceeds max_nodes
+        while len(self._routes) > 1 and (len(self._routes) > self.max_entries
+                                         or self._nodes > self.max_nodes):
+            _, old = self._routes.popitem(last=False)
+            self._nodes -= len(old.path)
+            self.evictions += 1
+
+    def clear(self):
+        self._routes.clear()
+        self._nodes = 0
+
+    def __len__(self):
+        return len(self._routes)
+
+    def stats(self):
+        """Counters for tuning max_entries / max_nodes."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._routes),
+            "nodes": self._nodes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
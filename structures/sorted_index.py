@@ -0,0 +1,66 @@
+# Items kept ordered by a key, for paged scans in sort order.
+from bisect import bisect_left, insort
+
+
+class SortedIndex:
+    """
+    Keeps (key(item), item_id) pairs in a sorted list, so any page of the
+    order is a slice and needs no sorting. The item id breaks ties, which
+    also makes every entry unique and findable by binary search.
+
+    add/update/remove are a binary search plus one list insert or delete:
+    O(log n) comparisons and an O(n) memmove, which stays well under a
+    millisecond at 100k items.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self._entries = []  # sorted (key, item_id)
+        self._key_of = {}   # item_id -> key currently in _entries
+
+    def bulk_load(self, items):
+        """Replace the contents with (item_id, item) pairs. O(n log n)."""
+        self._key_of = {item_id: self.key(item) for item_id, item in items}
+        self._entries = sorted((k, item_id) for item_id, k in self._key_of.items())
+
+    def add(self, item_id, item):
+        """Insert item, or move it if its key changed."""
+        k = self.key(item)
+        old = self._key_of.get(item_id)
+        if old is not None:
+            if old == k:
+                return
+            self._delete(old, item_id)
+        self._key_of[item_id] = k
+        insort(self._entries, (k, item_id))
+
+    update = add
+
+    def remove(self, item_id):
+        k = self._key_of.pop(item_id, None)
+        if k is not None:
+            self._delete(k, item_id)
+
+    def _delete(self, k, item_id):
+        i = bisect_left(self._entries, (k, item_id))
+        del self._entries[i]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, item_id):
+        return item_id in self._key_of
+
+    def ids(self, start=0, stop=None, reverse=False):
+        """Item ids at positions start..stop of the order (descending if reverse)."""
+        n = len(self._entries)
+        stop = n if stop is None else min(stop, n)
+        if start >= stop:
+            return []
+        if reverse:
+            return [item_id for _, item_id in reversed(self._entries[n - stop:n - start])]
+        return [item_id for _, item_id in self._entries[start:stop]]
+
+    def iter_ids(self, reverse=False):
+        entries = reversed(self._entries) if reverse else self._entries
+        return (item_id for _, item_id in entries)
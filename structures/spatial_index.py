@@ -0,0 +1,151 @@
+# Uniform grid spatial index over (lat, lon) points.
+import heapq
+from math import sqrt, floor, ceil
+
+
+class GridIndex:
+    """
+    Buckets points into square cells of cell_size degrees so that nearest
+    neighbour and radius queries only look at cells around the query point.
+    Distances are Euclidean in degrees (same as routing.calculate_distance).
+    Supports incremental insert/remove.
+    """
+
+    def __init__(self, cell_size=0.01):
+        self.cell_size = cell_size
+        self.cells = {}   # (row, col) -> {item_id: (lat, lon)}
+        self.points = {}  # item_id -> (lat, lon)
+        # Bounding box of cells ever occupied (only grows; keeps queries finite)
+        self._bounds = None  # (min_row, max_row, min_col, max_col)
+
+    @staticmethod
+    def suggest_cell_size(coords, per_cell=4, default=0.01):
+        """
+        Pick a cell size giving roughly per_cell points per cell. Never
+        smaller than the bounding box's longer side split into
+        sqrt(n / per_cell) cells, so nearly collinear points do not produce
+        a near-zero cell size (and millions of empty cells to search).
+        """
+        coords = list(coords)
+        if len(coords) < 2:
+            return default
+        lats = [c[0] for c in coords]
+        lons = [c[1] for c in coords]
+        height = max(lats) - min(lats)
+        width = max(lons) - min(lons)
+        side = max(height, width)
+        if side <= 0:
+            return default
+        return max(sqrt(height * width * per_cell / len(coords)), side * sqrt(per_cell / len(coords)))
+
+    def _cell(self, lat, lon):
+        return (floor(lat / self.cell_size), floor(lon / self.cell_size))
+
+    def insert(self, item_id, lat, lon):
+        if item_id in self.points:
+            self.remove(item_id)
+        self.points[item_id] = (lat, lon)
+        row, col = self._cell(lat, lon)
+        self.cells.setdefault((row, col), {})[item_id] = (lat, lon)
+        if self._bounds is None:
+            self._bounds = (row, row, col, col)
+        else:
+            r0, r1, c0, c1 = self._bounds
+            self._bounds = (min(r0, row), max(r1, row), min(c0, col), max(c1, col))
+
+    def remove(self, item_id):
+        pos = self.points.pop(item_id, None)
+        if pos is None:
+            return False
+        key = self._cell(*pos)
+        cell = self.cells[key]
+        del cell[item_id]
+        if not cell:
+            del self.cells[key]
+        return True
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, item_id):
+        return item_id in self.points
+
+    def _ring(self, row, col, r):
+        """Yield the cells at Chebyshev distance exactly r from (row, col)."""
+        if r == 0:
+            cell = self.cells.get((row, col))
+            if cell:
+                yield cell
+            return
+        for c in range(col - r, col + r + 1):
+            for rr in (row - r, row + r):
+                cell = self.cells.get((rr, c))
+                if cell:
+                    yield cell
+        for rr in range(row - r + 1, row + r):
+            for c in (col - r, col + r):
+                cell = self.cells.get((rr, c))
+                if cell:
+                    yield cell
+
+    def _cells_between(self, row, col, r_min, r_max):
+        """Occupied cells at Chebyshev distance r_min..r_max, by scanning the occupied cells."""
+        for (rr, cc), cell in self.cells.items():
+            if r_min <= max(abs(rr - row), abs(cc - col)) <= r_max:
+                yield cell
+
+    def _max_ring(self, row, col):
+        """Ring radius beyond which no occupied cell exists."""
+        r0, r1, c0, c1 = self._bounds
+        return max(row - r0, r1 - row, col - c0, c1 - col, 0)
+
+    def nearest(self, lat, lon, k=1, exclude=None):
+        """
+        Return up to k (distance, item_id) pairs closest to (lat, lon),
+        nearest first. exclude skips a single id (e.g. the query node itself).
+        """
+        if k <= 0 or not self.cells:
+            return []
+        row, col = self._cell(lat, lon)
+        max_ring = self._max_ring(row, col)
+        best = []  # max-heap of (-dist, item_id), size <= k
+        r = 0
+        while r <= max_ring:
+            # Far from the data a ring has more cells than are occupied in
+            # total: check the remaining occupied cells directly and stop
+            scan_rest = 8 * r > len(self.cells)
+            cells = (self._cells_between(row, col, r, max_ring) if scan_rest
+                     else self._ring(row, col, r))
+            for cell in cells:
+                for item_id, (plat, plon) in cell.items():
+                    if item_id == exclude:
+                        continue
+                    d = sqrt((lat - plat) ** 2 + (lon - plon) ** 2)
+                    if len(best) < k:
+                        heapq.heappush(best, (-d, item_id))
+                    elif d < -best[0][0]:
+                        heapq.heapreplace(best, (-d, item_id))
+            # Anything outside rings 0..r is at least r * cell_size away
+            if scan_rest or (len(best) == k and -best[0][0] <= r * self.cell_size):
+                break
+            r += 1
+        return sorted((-nd, item_id) for nd, item_id in best)
+
+    def within(self, lat, lon, radius):
+        """Return all (distance, item_id) pairs within radius, nearest first."""
+        if not self.cells:
+            return []
+        row, col = self._cell(lat, lon)
+        rings = min(ceil(radius / self.cell_size), self._max_ring(row, col))
+        out = []
+        if (2 * rings + 1) ** 2 > len(self.cells):
+            cells = self._cells_between(row, col, 0, rings)
+        else:
+            cells = (cell for r in range(rings + 1) for cell in self._ring(row, col, r))
+        for cell in cells:
+            for item_id, (plat, plon) in cell.items():
+                d = sqrt((lat - plat) ** 2 + (lon - plon) ** 2)
+                if d <= radius:
+                    out.append((d, item_id))
+        out.sort()
+        return out
@@ -0,0 +1,44 @@
+# Disjoint-set forest (union-find) with union by size and path halving.
+class UnionFind:
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    def add(self, item):
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+
+    def find(self, item):
+        """Representative of item's set (item must have been added). ~O(α(n))."""
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]  # path halving
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        """Merge the sets of a and b; returns False if they were already joined."""
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return False
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.size[ra] += self.size.pop(rb)
+        return True
+
+    def connected(self, a, b):
+        if a not in self.parent or b not in self.parent:
+            return False
+        return self.find(a) == self.find(b)
+
+    def __contains__(self, item):
+        return item in self.parent
+
+    def __len__(self):
+        return len(self.parent)
+
+    def count(self):
+        """Number of disjoint sets."""
+        return len(self.size)
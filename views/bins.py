@@ -1,14 +1,43 @@
 """Bins registry view for GreenBin application."""
 from nicegui import ui
-import pandas as pd
-from algorithms.sorting import merge_sort
-from algorithms.searching import search_by_substring
+import state
+from .history import SEARCH_DEBOUNCE_MS
 from .tables import BINS_COLUMNS, BINS_FILL_SLOT, BINS_STATUS_SLOT, BINS_ACTIONS_SLOT
 
+ROWS_PER_PAGE = 10
+
+# Sortable table column -> precomputed order in state.bin_order
+COLUMN_ORDERS = {"id": "id", "type": "type", "loc": "location", "fill": "fill"}
+
+# "Sort By" choice -> (table column, descending)
+SORT_CHOICES = {
+    "ID": ("id", False),
+    "Fill Level": ("fill", True),
+    "Type": ("type", False),
+    "Location": ("loc", False),
+}
+
+
+# Row shown in the bin directory table
+def bin_row(b):
+    return {
+        "id": b.id,
+        "waste_type": b.waste_type,
+        "location": f"{b.lat:.4f}, {b.lon:.4f}",
+        "fill_level": b.fill_level,
+        "status": ("Critical" if b.fill_level >= 80 else
+                  "High" if b.fill_level >= 50 else
+                  "Medium" if b.fill_level >= 25 else
+                  "Low" if b.fill_level > 0 else "Empty")
+    }
+
 
 # Render the bin registry and management view with search, filter, and actions
 def render_bin_registry(bins, open_add_bin_dialog, open_update_fill_dialog, dispatch_bin_logic, simulate_updates_action, collect_all_bins_action):
-    """Render the bin registry and management view."""
+    """
+    Render the bin registry and management view. Returns update_bins(changed),
+    which refreshes the counters and the visible page in place.
+    """
     with ui.row().classes("w-full justify-between items-center mb-6"):
         ui.label("Bin Registry & Management").classes("text-2xl font-bold")
         with ui.row().classes("gap-3"):
@@ -17,20 +46,29 @@ def render_bin_registry(bins, open_add_bin_dialog, open_update_fill_dialog, disp
             ui.button("Simulate Updates", on_click=simulate_updates_action, icon="update").props("outline color=secondary")
 
     # Stats overview
-    total_bins = len(bins)
-    urgent_bins = len([b for b in bins if b.fill_level >= 80])
-    avg_fill = sum(b.fill_level for b in bins) / total_bins if total_bins else 0
-    
     with ui.row().classes("w-full gap-4 mb-6"):
         with ui.card().classes("flex-1 p-4"):
             ui.label("Total Bins").classes("text-sm text-gray-600")
-            ui.label(str(total_bins)).classes("text-3xl font-bold")
+            total_label = ui.label().classes("text-3xl font-bold")
         with ui.card().classes("flex-1 p-4"):
             ui.label("Urgent (≥80%)").classes("text-sm text-gray-600")
-            ui.label(str(urgent_bins)).classes("text-3xl font-bold text-red-600")
+            urgent_label = ui.label().classes("text-3xl font-bold text-red-600")
         with ui.card().classes("flex-1 p-4"):
             ui.label("Avg Fill Level").classes("text-sm text-gray-600")
-            ui.label(f"{avg_fill:.1f}%").classes("text-3xl font-bold")
+            avg_label = ui.label().classes("text-3xl font-bold")
+
+    def update_stats():
+        total_bins = len(bins)
+        urgent_bins = len([b for b in bins if b.fill_level >= 80])
+        avg_fill = sum(b.fill_level for b in bins) / total_bins if total_bins else 0
+        total_label.text = str(total_bins)
+        urgent_label.text = str(urgent_bins)
+        avg_label.text = f"{avg_fill:.1f}%"
+        if registered_label is not None:
+            registered_label.text = f"{total_bins} bins registered"
+
+    registered_label = None
+    update_stats()
 
     # Search & filter card
     with ui.card().classes("w-full p-6 shadow-lg rounded-lg bg-white"):
@@ -38,79 +76,74 @@ def render_bin_registry(bins, open_add_bin_dialog, open_update_fill_dialog, disp
             ui.label("Bin Directory").classes("text-xl font-bold text-gray-800")
             with ui.row().classes("gap-3 items-center"):
                 ui.button("Collect All", on_click=collect_all_bins_action, icon="cleaning_services").classes("bg-red-500 text-white")
-                ui.label(f"{len(bins)} bins registered").classes("text-sm text-gray-500 bg-gray-100 px-3 py-1 rounded-full")
+                registered_label = ui.label(f"{len(bins)} bins registered").classes("text-sm text-gray-500 bg-gray-100 px-3 py-1 rounded-full")
         
         with ui.row().classes("w-full gap-4 mb-4"):
-            search_input = ui.input(placeholder="Search by Bin ID...").classes("flex-1").props("outlined dense")
+            search_input = ui.input(placeholder="Search by Bin ID...").classes("flex-1").props(f"outlined dense debounce={SEARCH_DEBOUNCE_MS}")
             sort_select = ui.select(
                 ["ID", "Fill Level", "Type", "Location"], 
                 value="Fill Level", 
                 label="Sort By"
             ).classes("w-48").props("outlined dense")
 
-        table_container = ui.column().classes("w-full")
-
-        # Refresh and render the bin table with current filters
-        def refresh_bin_table():
-            table_container.clear()
-            query = search_input.value.strip()
-            sort_by = sort_select.value
-            
-            # Filter
-            if query:
-                filtered_bins = search_by_substring(bins, lambda b: b.id, query)
-            else:
-                filtered_bins = bins[:]
-            
-            # Sort
-            if sort_by == "ID":
-                filtered_bins = merge_sort(filtered_bins, key=lambda b: b.id)
-            elif sort_by == "Fill Level":
-                filtered_bins = merge_sort(filtered_bins, key=lambda b: b.fill_level)
-                filtered_bins.reverse()
-            elif sort_by == "Type":
-                filtered_bins = merge_sort(filtered_bins, key=lambda b: b.waste_type)
-            elif sort_by == "Location":
-                filtered_bins = merge_sort(filtered_bins, key=lambda b: (b.lat, b.lon))
-
-            # Create table data
-            df_bins = pd.DataFrame([
-                {
-                    "id": b.id,
-                    "waste_type": b.waste_type,
-                    "location": f"{b.lat:.4f}, {b.lon:.4f}",
-                    "fill_level": b.fill_level,
-                    "status": ("Critical" if b.fill_level >= 80 else
-                              "High" if b.fill_level >= 50 else
-                              "Medium" if b.fill_level >= 25 else
-                              "Low" if b.fill_level > 0 else "Empty")
-                }
-                for b in filtered_bins
-            ])
-            
-            rows = df_bins.to_dict('records') if not df_bins.empty else []
-
-            with table_container:
-                if rows:
-                    table = ui.table(
-                        columns=BINS_COLUMNS,
-                        rows=rows,
-                        pagination=10
-                    ).classes("w-full").props('flat bordered dense separator="cell"')
-                    
-                    # Fill level progress bar
-                    table.add_slot('body-cell-fill', BINS_FILL_SLOT)
-                    
-                    # Status badge
-                    table.add_slot('body-cell-status', BINS_STATUS_SLOT)
-                    
-                    # Action buttons
-                    table.add_slot('body-cell-actions', BINS_ACTIONS_SLOT)
-                    
-                    table.on('dispatch', lambda e: dispatch_bin_logic(e.args['id']))
-                else:
-                    ui.label("No bins match your search criteria").classes("text-gray-500 text-center py-8")
-
-        search_input.on_value_change(lambda: refresh_bin_table())
-        sort_select.on_value_change(lambda: refresh_bin_table())
-        refresh_bin_table()
+        # Only the visible page is queried and sent: the table runs in
+        # Quasar's server-side mode (rowsNumber set), so paging and header
+        # sorting arrive as 'request' events answered by state.query_bins
+        sort_by, descending = SORT_CHOICES[sort_select.value]
+        table = ui.table(
+            columns=BINS_COLUMNS,
+            rows=[],
+            row_key="id",
+            pagination={"page": 1, "rowsPerPage": ROWS_PER_PAGE, "sortBy": sort_by,
+                        "descending": descending, "rowsNumber": 0}
+        ).classes("w-full").props('flat bordered dense separator="cell" :rows-per-page-options="[10, 20, 50]"')
+        
+        # Fill level progress bar
+        table.add_slot('body-cell-fill', BINS_FILL_SLOT)
+        
+        # Status badge
+        table.add_slot('body-cell-status', BINS_STATUS_SLOT)
+        
+        # Action buttons
+        table.add_slot('body-cell-actions', BINS_ACTIONS_SLOT)
+        
+        table.on('dispatch', lambda e: dispatch_bin_logic(e.args['id']))
+        empty_label = ui.label("No bins match your search criteria").classes("text-gray-500 text-center py-8")
+
+        # Query and show one page of the bin table with current filters
+        def load_page(pagination):
+            rows_per_page = pagination.get("rowsPerPage") or ROWS_PER_PAGE
+            page = max(1, pagination.get("page", 1))
+
+            def fetch(page):
+                return state.query_bins(
+                    search_input.value or "",
+                    sort_by=COLUMN_ORDERS.get(pagination.get("sortBy"), "fill"),
+                    descending=bool(pagination.get("descending")),
+                    offset=(page - 1) * rows_per_page, limit=rows_per_page)
+
+            page_bins, total = fetch(page)
+            if not page_bins and page > 1:
+                # the page emptied under us (new search or removals): show the last one
+                page = max(1, -(-total // rows_per_page))
+                page_bins, _ = fetch(page)
+            table.pagination = {**pagination, "page": page, "rowsPerPage": rows_per_page, "rowsNumber": total}
+            table.update_rows([bin_row(b) for b in page_bins], clear_selection=False)
+            table.set_visibility(total > 0)
+            empty_label.set_visibility(total == 0)
+
+        def on_sort_choice():
+            sort_by, descending = SORT_CHOICES[sort_select.value]
+            load_page({**table.pagination, "page": 1, "sortBy": sort_by, "descending": descending})
+
+        table.on('request', lambda e: load_page(e.args['pagination']))
+        search_input.on_value_change(lambda: load_page({**table.pagination, "page": 1}))
+        sort_select.on_value_change(on_sort_choice)
+        load_page(table.pagination)
+
+    # Changed bins may move between pages, so the visible page is re-queried
+    def update_bins(changed):
+        update_stats()
+        load_page(table.pagination)
+
+    return update_bins
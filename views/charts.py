@@ -1,8 +1,8 @@
 """Chart configurations for the dashboard."""
 
 # --- Dashboard View ---
-def get_bin_status_chart_options(bins):
-    """Generate EChart options for Bin Status Pie Chart."""
+def get_bin_status_counts(bins):
+    """Count bins per fill status."""
     status_counts = {"Critical": 0, "High": 0, "Medium": 0, "Low": 0, "Empty": 0}
     for b in bins:
         if b.fill_level >= 80: 
@@ -15,6 +15,25 @@ def get_bin_status_chart_options(bins):
             status_counts["Low"] += 1
         else: 
             status_counts["Empty"] += 1
+    return status_counts
+
+
+def get_bin_status_chart_data(status_counts):
+    """Pie slices for the Bin Status chart (empty statuses are left out)."""
+    return [
+        item for item in [
+            {"value": status_counts["Critical"], "name": "Critical", "itemStyle": {"color": "#DC2626"}},
+            {"value": status_counts["High"], "name": "High", "itemStyle": {"color": "#EA580C"}},
+            {"value": status_counts["Medium"], "name": "Medium", "itemStyle": {"color": "#CA8A04"}},
+            {"value": status_counts["Low"], "name": "Low", "itemStyle": {"color": "#16A34A"}},
+            {"value": status_counts["Empty"], "name": "Empty", "itemStyle": {"color": "#6B7280"}}
+        ] if item["value"] > 0
+    ]
+
+
+def get_bin_status_chart_options(bins):
+    """Generate EChart options for Bin Status Pie Chart."""
+    status_counts = get_bin_status_counts(bins)
 
     return {
         "tooltip": {
@@ -74,15 +93,7 @@ def get_bin_status_chart_options(bins):
                 "scale": True,
                 "scaleSize": 8
             },
-            "data": [
-                item for item in [
-                    {"value": status_counts["Critical"], "name": "Critical", "itemStyle": {"color": "#DC2626"}},
-                    {"value": status_counts["High"], "name": "High", "itemStyle": {"color": "#EA580C"}},
-                    {"value": status_counts["Medium"], "name": "Medium", "itemStyle": {"color": "#CA8A04"}},
-                    {"value": status_counts["Low"], "name": "Low", "itemStyle": {"color": "#16A34A"}},
-                    {"value": status_counts["Empty"], "name": "Empty", "itemStyle": {"color": "#6B7280"}}
-                ] if item["value"] > 0
-            ]
+            "data": get_bin_status_chart_data(status_counts)
         }]
     }
 
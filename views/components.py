@@ -2,13 +2,73 @@
 from nicegui import ui
 
 
+class StatCard:
+    """Statistic card whose value can be changed without rebuilding the card."""
+
+    def __init__(self, title, value, subtitle=None, border_color="#FFFFFF"):
+        with ui.card().classes("p-4 rounded-xl shadow-md flex-1"):
+            with ui.row().classes("items-start justify-between"):
+                with ui.column():
+                    ui.label(title).classes("text-sm text-gray-600")
+                    self.value_label = ui.label(value).classes("text-2xl font-bold")
+                    if subtitle:
+                        ui.label(subtitle).classes("text-xs text-gray-500")
+                ui.icon("bar_chart").classes("text-3xl").style(f"color: {border_color}")
+
+    def set_value(self, value):
+        # the label only sends itself to the clients when its text changes
+        self.value_label.text = value
+
+
 def create_stat_card(title, value, subtitle=None, border_color="#FFFFFF"):
     """Create a standardized statistic card."""
-    with ui.card().classes("p-4 rounded-xl shadow-md flex-1"):
-        with ui.row().classes("items-start justify-between"):
-            with ui.column():
-                ui.label(title).classes("text-sm text-gray-600")
-                ui.label(value).classes("text-2xl font-bold")
-                if subtitle:
-                    ui.label(subtitle).classes("text-xs text-gray-500")
-            ui.icon("bar_chart").classes("text-3xl").style(f"color: {border_color}")
+    return StatCard(title, value, subtitle, border_color)
+
+
+class LiveTable:
+    """
+    Wraps a ui.table so callers can apply row deltas: changed rows replace
+    the row with the same key (or are appended), removed keys are dropped,
+    and only this table's rows go over the websocket.
+    """
+
+    def __init__(self, table, row_key="id"):
+        self.table = table
+        self.row_key = row_key
+
+    def apply(self, changed=(), removed=(), add=True):
+        """Patch rows in place; with add=False, changed rows not yet shown are skipped."""
+        key = self.row_key
+        changed = {row[key]: row for row in changed}
+        removed = set(removed)
+        if not changed and not removed:
+            return
+        rows = []
+        for row in self.table.rows:
+            if row[key] in removed:
+                continue
+            rows.append(changed.pop(row[key], row))
+        if add:
+            rows.extend(changed.values())
+        self.table.update_rows(rows, clear_selection=False)
+
+
+def patch_chart(chart, options):
+    """Merge options into an ui.echart's options and push only that chart."""
+    _merge(chart.options, options)
+    chart.update()
+
+
+def _merge(target, patch):
+    # dicts merge key by key; lists of dicts merge item by item, so a patch
+    # like {"series": [{"data": [...]}]} keeps the rest of the series styling
+    for key, value in patch.items():
+        current = target.get(key)
+        if isinstance(value, dict) and isinstance(current, dict):
+            _merge(current, value)
+        elif (isinstance(value, list) and isinstance(current, list) and len(value) == len(current)
+              and all(isinstance(v, dict) and isinstance(c, dict) for v, c in zip(value, current))):
+            for c, v in zip(current, value):
+                _merge(c, v)
+        else:
+            target[key] = value
@@ -1,16 +1,22 @@
 """Dashboard view for GreenBin application."""
 from nicegui import ui
-import pandas as pd
-from .components import create_stat_card
-from .charts import get_bin_status_chart_options, get_waste_composition_chart_options
+import state
+import storage
+from .components import LiveTable, create_stat_card, patch_chart
+from .charts import (get_bin_status_chart_data, get_bin_status_chart_options, get_bin_status_counts,
+                     get_waste_composition_chart_options)
 
 
 # Calculate dashboard statistics
 def get_stats(bins, history, requests):
     """Calculate dashboard statistics."""
-    total_collections = len([h for h in history if h.get('status') == 'Collected'])
+    if state.history_index.ready:
+        total_collections = state.history_index.count(status="Collected")
+    else:
+        # history still loading, no index yet
+        total_collections = storage.count_history(status="Collected")
     co2_saved = total_collections * 2.5
-    urgent_count = len([b for b in bins if b.fill_level >= 80])
+    urgent_count = len(state.urgency.items_at_least(80))
     pending_count = len(requests)
     return total_collections, co2_saved, urgent_count, pending_count
 
@@ -20,71 +26,88 @@ def undo_specific_history(entry, bins, history, save_all, refresh_ui):
     """Undo a specific history record."""
     b = next((x for x in bins if x.id == entry["bin_id"]), None)
     if b and "prev_fill" in entry:
-        b.fill_level = entry["prev_fill"]
+        state.set_fill_level(b, entry["prev_fill"])
     # remove entry from history
     for i in range(len(history)-1, -1, -1):
         if history[i]["timestamp"] == entry["timestamp"] and history[i]["bin_id"] == entry["bin_id"]:
-            history.pop(i)
+            state.remove_history(history[i])
             break
-    save_all()
+    save_all("bins")
     ui.notify("Undid collection", color="info")
     refresh_ui()
 
 
 from .tables import DASHBOARD_URGENT_COLUMNS, DASHBOARD_URGENT_ACTIONS_SLOT
 
+
+# Row shown in the urgent bins table
+def urgent_row(b):
+    return {"id": b.id, "waste_type": b.waste_type, "fill_level": f"{b.fill_level}%", "status": "CRITICAL"}
+
+
 # Render the urgent bins table with dispatch actions
 def render_urgent_bins_table(bins, collect_urgent_action, dispatch_bin_logic):
-    """Render the table of urgent bins."""
+    """Render the table of urgent bins; returns a function taking changed bins."""
     with ui.card().classes("flex-1 p-0 shadow-sm"):
         with ui.row().classes("p-4 border-b w-full items-center"):
             ui.label("Critical / Urgent Bins").classes("text-lg font-semibold")
             ui.button("Collect Urgent", on_click=collect_urgent_action).classes("ml-auto bg-red-500 text-white")
-        urgent_bins = [b for b in bins if b.fill_level >= 80]
-        
-        # Create DataFrame for urgent bins
-        if urgent_bins:
-            df_urgent = pd.DataFrame([
-                {"id": b.id, "waste_type": b.waste_type, "fill_level": b.fill_level, "status": "CRITICAL"}
-                for b in urgent_bins
-            ])
-            df_urgent['fill_level'] = df_urgent['fill_level'].astype(str) + '%'
-        
-        rows = df_urgent.to_dict('records') if urgent_bins else []
-        if urgent_bins:
-            with ui.table(columns=DASHBOARD_URGENT_COLUMNS, rows=rows, pagination=10).classes("w-full shadow-md").props('bordered flat separator="cell" rows-per-page-options="[10,20]"') as table:
-                table.add_slot('body-cell-actions', DASHBOARD_URGENT_ACTIONS_SLOT)
-                table.on('dispatch', lambda e: dispatch_bin_logic(e.args['id']))
-        else:
-            ui.label("No critical bins at the moment").classes("p-4 text-gray-500")
+        rows = [urgent_row(b) for b in state.urgency.items_at_least(80)]
+        # The table is always built (hidden while empty) so bins that become
+        # urgent later can be added to it as rows
+        with ui.table(columns=DASHBOARD_URGENT_COLUMNS, rows=rows, pagination=10).classes("w-full shadow-md").props('bordered flat separator="cell" rows-per-page-options="[10,20]"') as table:
+            table.add_slot('body-cell-actions', DASHBOARD_URGENT_ACTIONS_SLOT)
+            table.on('dispatch', lambda e: dispatch_bin_logic(e.args['id']))
+        empty_label = ui.label("No critical bins at the moment").classes("p-4 text-gray-500")
+        table.set_visibility(bool(rows))
+        empty_label.set_visibility(not rows)
+    live = LiveTable(table)
+
+    def update_bins(changed):
+        live.apply(changed=[urgent_row(b) for b in changed if b.fill_level >= 80],
+                   removed=[b.id for b in changed if b.fill_level < 80])
+        table.set_visibility(bool(table.rows))
+        empty_label.set_visibility(not table.rows)
+
+    return update_bins
 
 
 # Render recent collection history
 def render_recent_collections(history):
-    """Render the list of recent collections."""
+    """Render the list of recent collections; returns a function that redraws it."""
     with ui.card().classes("w-1/3 p-4 shadow-md rounded-xl"):
         ui.label("Recent Collections").classes("text-lg font-semibold mb-3")
-
-        if history:
-            for entry in history[-5:][::-1]:
-                with ui.row().classes(
-                    "w-full items-center justify-between p-3 border rounded-lg mb-2 recent-collection-card"
-                ):
-                    # Left side (bin + timestamp)
-                    with ui.column().classes("gap-1"):
-                        ui.label(f"🗑️ {entry['bin_id']} — {entry['type']}").classes(
-                            "font-semibold text-sm"
-                        )
-                        ui.label(entry["timestamp"]).classes(
-                            "text-xs text-gray-500"
-                        )
-        else:
-            ui.label("No recent collections").classes("text-sm text-gray-500")
+        entries = ui.column().classes("w-full gap-0")
+
+    def refresh():
+        entries.clear()
+        with entries:
+            if history:
+                for entry in history[-5:][::-1]:
+                    with ui.row().classes(
+                        "w-full items-center justify-between p-3 border rounded-lg mb-2 recent-collection-card"
+                    ):
+                        # Left side (bin + timestamp)
+                        with ui.column().classes("gap-1"):
+                            ui.label(f"🗑️ {entry['bin_id']} — {entry['type']}").classes(
+                                "font-semibold text-sm"
+                            )
+                            ui.label(entry["timestamp"]).classes(
+                                "text-xs text-gray-500"
+                            )
+            else:
+                ui.label("No recent collections").classes("text-sm text-gray-500")
+
+    refresh()
+    return refresh
 
 
 # Main dashboard rendering function
 def render_dashboard(bins, history, requests, collect_urgent_action, dispatch_bin_logic, save_all, refresh_ui):
-    """Render the dashboard view."""
+    """
+    Render the dashboard view. Returns update_bins(changed), which pushes
+    changed bins to the cards, charts and urgent table in place.
+    """
     tc, co2, uc, pc = get_stats(bins, history, requests)
 
     # Header
@@ -93,27 +116,15 @@ def render_dashboard(bins, history, requests, collect_urgent_action, dispatch_bi
 
     # Stats row
     with ui.row().classes("w-full gap-6 mb-6"):
-        create_stat_card("Total Collections", str(tc), "Collections completed", border_color="#3B82F6")
-        create_stat_card("CO₂ Saved (kg)", f"{co2:.1f}", "Estimated", border_color="#10B981")
-        create_stat_card("Urgent Bins", str(uc), "≥80% full", border_color="#EF4444")
-        create_stat_card("Pending Requests", str(pc), "Awaiting processing", border_color="#8B5CF6")
+        collections_card = create_stat_card("Total Collections", str(tc), "Collections completed", border_color="#3B82F6")
+        co2_card = create_stat_card("CO₂ Saved (kg)", f"{co2:.1f}", "Estimated", border_color="#10B981")
+        urgent_card = create_stat_card("Urgent Bins", str(uc), "≥80% full", border_color="#EF4444")
+        pending_card = create_stat_card("Pending Requests", str(pc), "Awaiting processing", border_color="#8B5CF6")
 
     # Visualizations
     with ui.row().classes("w-full gap-6 mb-6"):
         # Bin Status Pie Chart
-        status_counts = {"Critical": 0, "High": 0, "Medium": 0, "Low": 0, "Empty": 0}
-        for b in bins:
-            if b.fill_level >= 80: 
-                status_counts["Critical"] += 1
-            elif b.fill_level >= 50: 
-                status_counts["High"] += 1
-            elif b.fill_level >= 25: 
-                status_counts["Medium"] += 1
-            elif b.fill_level > 0: 
-                status_counts["Low"] += 1
-            else: 
-                status_counts["Empty"] += 1
-
+        status_counts = get_bin_status_counts(bins)
         total_bins = sum(status_counts.values())
 
         with ui.card().classes("flex-1 p-6 shadow-lg rounded-lg bg-white"):
@@ -122,7 +133,7 @@ def render_dashboard(bins, history, requests, collect_urgent_action, dispatch_bi
                 ui.label("Bin Status Distribution").classes("text-xl font-bold text-gray-800")
                 ui.label(f"Total: {total_bins} bins").classes("text-sm font-medium text-gray-500 bg-gray-100 px-3 py-1 rounded-full")
             
-            ui.echart(get_bin_status_chart_options(bins)).classes("h-80")
+            status_chart = ui.echart(get_bin_status_chart_options(bins)).classes("h-80")
 
         # Waste Type Bar Chart
         type_counts = {}
@@ -140,7 +151,20 @@ def render_dashboard(bins, history, requests, collect_urgent_action, dispatch_bi
     # Main content split
     with ui.row().classes("w-full gap-6 items-start"):
         # Left: urgent table
-        render_urgent_bins_table(bins, collect_urgent_action, dispatch_bin_logic)
+        update_urgent_table = render_urgent_bins_table(bins, collect_urgent_action, dispatch_bin_logic)
 
         # Right Panel: Recent History
-        render_recent_collections(history)
+        refresh_recent = render_recent_collections(history)
+
+    # Fill changes never change bin types, so the composition chart stays as is
+    def update_bins(changed):
+        tc, co2, uc, pc = get_stats(bins, history, requests)
+        collections_card.set_value(str(tc))
+        co2_card.set_value(f"{co2:.1f}")
+        urgent_card.set_value(str(uc))
+        pending_card.set_value(str(pc))
+        patch_chart(status_chart, {"series": [{"data": get_bin_status_chart_data(get_bin_status_counts(bins))}]})
+        update_urgent_table(changed)
+        refresh_recent()
+
+    return update_bins
@@ -1,6 +1,6 @@
 """Dispatch view for GreenBin application."""
 from nicegui import ui
-import routing
+import state
 
 def render_dispatch(bins, facilities, road_graph):
     """Render the dispatch center view."""
@@ -25,6 +25,11 @@ def render_dispatch(bins, facilities, road_graph):
                 value="None",
                 label="Select bin for shortest path"
             ).classes("flex-1")
+            route_target = ui.select(
+                options={"nearest": "Nearest facility", **{f.id: f.id for f in facilities}},
+                value="nearest",
+                label="Route to"
+            ).classes("w-48")
             
             with ui.row().classes("gap-3 items-center"):
                 ui.label(f"Urgent: {len(urg)}").classes("text-sm font-semibold text-red-600 bg-red-50 px-3 py-2 rounded-lg")
@@ -40,15 +45,26 @@ def render_dispatch(bins, facilities, road_graph):
         
         # Path calculation for map (if needed)
         path = []
+        no_route = False
         if selected_bin.value != "None":
             bin_obj = next((b for b in bins if b.id == selected_bin.value), None)
             if bin_obj:
-                nearest_facility = min(facilities,
-                                      key=lambda f: routing.calculate_distance(bin_obj.lat, bin_obj.lon, f.lat, f.lon))
-                path = road_graph.dijkstra(bin_obj.id, nearest_facility.id)
+                if route_target.value == "nearest":
+                    # nearest facility by road, from the cached facility tree
+                    route = state.route_to_nearest_facility(bin_obj.id)
+                else:
+                    # point-to-point, served from the shared route cache
+                    route = state.find_route(bin_obj.id, route_target.value)
+                path = route.path
+                no_route = not route.found
         
         # Map
         with map_container:
+            if no_route:
+                with ui.row().classes("items-center gap-2 text-sm font-semibold text-red-600 bg-red-50 px-3 py-2 rounded-lg mb-2"):
+                    ui.icon("wrong_location")
+                    target = "any facility" if route_target.value == "nearest" else route_target.value
+                    ui.label(f"No route: {selected_bin.value} is not connected to {target} by road")
             fig = go.Figure()
             
             # Add road network if enabled
@@ -103,10 +119,7 @@ def render_dispatch(bins, facilities, road_graph):
             if selected_bin.value != "None":
                 bin_obj = next((b for b in bins if b.id == selected_bin.value), None)
                 if bin_obj:
-                    nearest_facility = min(facilities,
-                                          key=lambda f: routing.calculate_distance(bin_obj.lat, bin_obj.lon, f.lat, f.lon))
-                    path = road_graph.dijkstra(bin_obj.id, nearest_facility.id)
-                    
+                    # path was already computed above
                     if path and len(path) > 1:
                         # Get coordinates for path
                         path_lats = []
@@ -140,6 +153,7 @@ def render_dispatch(bins, facilities, road_graph):
 
     
     selected_bin.on_value_change(lambda: update_view())
+    route_target.on_value_change(lambda: update_view())
     show_all_bins.on_value_change(lambda: update_view())
     show_network.on_value_change(lambda: update_view())
     update_view()
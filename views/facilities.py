@@ -1,4 +1,5 @@
 """Facilities view for GreenBin application."""
+import math
 from nicegui import ui
 import pandas as pd
 from algorithms.sorting import merge_sort
@@ -7,11 +8,19 @@ import services.report_generator as report_gen
 from .charts import get_capacity_efficiency_scatter_options
 from .tables import FACILITIES_COLUMNS, FACILITIES_EFFICIENCY_SLOT
 
-def render_facility_report(facilities, facilities_avl, bins, history):
+# Efficiency filter -> [lo, hi) range over (efficiency, id) keys
+EFFICIENCY_BANDS = {
+    "All": (None, None),
+    "High (>90%)": ((math.nextafter(90.0, math.inf),), None),
+    "Medium (70-90%)": ((70.0,), (math.nextafter(90.0, math.inf),)),
+    "Low (<70%)": (None, (70.0,)),
+}
+
+def render_facility_report(facilities, facilities_avl, facilities_by_efficiency, bins):
     """Render the facility performance report."""
     with ui.row().classes("w-full justify-between items-center mb-6"):
         ui.label("Facility Performance Report").classes("text-2xl font-bold")
-        ui.button("Download Report", icon="download", on_click=lambda: ui.download(report_gen.generate_professional_report(bins, history, facilities))).classes("bg-blue-600 text-white")
+        ui.button("Download Report", icon="download", on_click=lambda: ui.download(report_gen.generate_professional_report(bins, facilities))).classes("bg-blue-600 text-white")
     
     if not facilities:
         with ui.card().classes("w-full p-8 text-center shadow-sm"):
@@ -59,37 +68,27 @@ def render_facility_report(facilities, facilities_avl, bins, history):
             query = search_input.value.strip()
             eff_val = eff_filter.value
             
-            # Filter by efficiency
-            filtered_facs = facilities[:]
-            if eff_val == "High (>90%)":
-                filtered_facs = [f for f in filtered_facs if f.efficiency > 90]
-            elif eff_val == "Medium (70-90%)":
-                filtered_facs = [f for f in filtered_facs if 70 <= f.efficiency <= 90]
-            elif eff_val == "Low (<70%)":
-                filtered_facs = [f for f in filtered_facs if f.efficiency < 70]
+            # Efficiency band as a key range on the efficiency tree
+            # (keys are (efficiency, id); a 1-tuple sorts before any id)
+            lo, hi = EFFICIENCY_BANDS[eff_val]
 
-            # Search by ID
+            # Search by ID prefix on the ID tree, then keep facilities in the band
             if query:
-                found = facilities_avl.get(query)
-                if found and found in filtered_facs:
-                    df_facilities = pd.DataFrame([{
-                        "id": found.id, 
-                        "loc": f"{found.lat:.4f}, {found.lon:.4f}", 
-                        "cap": found.capacity,
-                        "eff_val": found.efficiency
-                    }])
-                else:
-                    df_facilities = pd.DataFrame()
-            else:
-                sorted_facs = merge_sort(filtered_facs, key=lambda x: x.efficiency)
+                matches = facilities_avl.prefix(query)
+                in_band = [f for f in matches
+                           if (lo is None or (f.efficiency,) >= lo) and (hi is None or (f.efficiency,) < hi)]
+                sorted_facs = merge_sort(in_band, key=lambda x: x.efficiency)
                 sorted_facs.reverse()
-                
-                df_facilities = pd.DataFrame([{
-                    "id": f.id, 
-                    "loc": f"{f.lat:.4f}, {f.lon:.4f}",
-                    "cap": f.capacity,
-                    "eff_val": f.efficiency
-                } for f in sorted_facs])
+            else:
+                # Highest efficiency first, straight from the tree
+                sorted_facs = facilities_by_efficiency.range(lo, hi, reverse=True)
+            
+            df_facilities = pd.DataFrame([{
+                "id": f.id, 
+                "loc": f"{f.lat:.4f}, {f.lon:.4f}",
+                "cap": f.capacity,
+                "eff_val": f.efficiency
+            } for f in sorted_facs])
             
             rows = df_facilities.to_dict('records') if not df_facilities.empty else []
 
@@ -1,11 +1,13 @@
 """History view for GreenBin application."""
 from nicegui import ui
-import pandas as pd
-from algorithms.searching import search_by_substring
-from algorithms.sorting import merge_sort
+import state
 from .tables import HISTORY_DISPATCH_COLUMNS, HISTORY_UPDATE_COLUMNS, HISTORY_REQUEST_COLUMNS
 
 
+ROWS_PER_PAGE = 10
+SEARCH_DEBOUNCE_MS = 300  # inputs report their value once typing pauses this long
+
+
 # Create filter inputs for history views
 def create_history_filters(sort_options=None):
     """Create filter inputs for history views."""
@@ -13,124 +15,113 @@ def create_history_filters(sort_options=None):
         sort_options = ["Recent First", "Bin ID"]
     
     with ui.row().classes("w-full gap-4 mb-4"):
-        search = ui.input(placeholder="Search Bin ID...").classes("flex-1").props("outlined dense")
-        area = ui.input(placeholder="Filter Area (lat,lon)...").classes("flex-1").props("outlined dense")
+        search = ui.input(placeholder="Search Bin ID...").classes("flex-1").props(f"outlined dense debounce={SEARCH_DEBOUNCE_MS}")
+        area = ui.input(placeholder="Filter Area (lat,lon)...").classes("flex-1").props(f"outlined dense debounce={SEARCH_DEBOUNCE_MS}")
         type_filter = ui.select(["All", "Household", "Industrial", "Recyclable", "Organic"], 
                                 value="All", label="Waste Type").classes("w-48").props("outlined dense")
-        sort_by = ui.select(sort_options, value=sort_options[0], 
+        sort_by = ui.select(list(sort_options), value=list(sort_options)[0], 
                            label="Sort By").classes("w-48").props("outlined dense")
     return search, area, type_filter, sort_by
 
 
+# Page order for the "Sort By" choices: keyword arguments of HistoryIndex.page
+BASE_SORTS = {
+    "Recent First": {},
+    "Bin ID": {"order_by": lambda key: key.bin_id, "newest_first": False},
+}
+
+
 # Generic function to render a history tab with filtering and sorting
 def render_history_tab(
-    history,
     columns,
     filter_status,
     sort_options,
     enrich_fn=None,
+    prepare_fn=None,
     metrics_container=None,
     metrics_fn=None
 ):
     """
     Generic function to render a history tab.
+
+    Filtering runs on state.history_index and only the visible page of
+    records is fetched, enriched and sent (Quasar server-side pagination).
     
     Args:
-        history: Full history data
         columns: Table column definitions
         filter_status: Status value(s) to filter by (string or list)
-        sort_options: List of sort options for dropdown
-        enrich_fn: Optional function to enrich data (e.g., add distance/CO2)
+        sort_options: Dict of sort option label -> HistoryIndex.page ordering
+        enrich_fn: Optional function to enrich page records (e.g., add distance/CO2)
+        prepare_fn: Optional function called with the selected groups before paging
         metrics_container: Optional container for metrics display
-        metrics_fn: Optional function to calculate and display metrics
+        metrics_fn: Optional function to display metrics for the selected groups
+
+    Returns a function that reloads the current page (for live updates).
     """
     with ui.card().classes("w-full p-6 shadow-lg rounded-lg bg-white"):
         # Create filters
         search, area, type_filter, sort_by = create_history_filters(sort_options)
         
-        # Table container
-        table_container = ui.column().classes("w-full")
+        table = ui.table(
+            columns=columns,
+            rows=[],
+            pagination={"page": 1, "rowsPerPage": ROWS_PER_PAGE, "rowsNumber": 0}
+        ).classes("w-full").props('flat bordered dense separator="cell" :rows-per-page-options="[10, 20, 50]"')
         
-        def refresh_table():
-            table_container.clear()
-            if metrics_container:
-                metrics_container.clear()
-            
-            query = search.value.strip()
-            area_query = area.value.strip()
+        def load_page(pagination):
             type_val = type_filter.value
-            sort_val = sort_by.value
+            rows_per_page = pagination.get("rowsPerPage") or ROWS_PER_PAGE
             
-            # Filter by status
-            if isinstance(filter_status, list):
-                filtered = [h for h in history if h.get('status') in filter_status]
-            else:
-                filtered = [h for h in history if h.get('status') == filter_status]
-            
-            # Filter by type
-            if type_val != "All":
-                filtered = [h for h in filtered if h.get('type') == type_val]
-            
-            # Filter by area
-            if area_query:
-                filtered = search_by_substring(filtered, lambda h: h.get("area", ""), area_query)
-            
-            # Enrich data if function provided
-            if enrich_fn:
-                filtered = enrich_fn(filtered)
-            
-            # Search by bin ID
-            if query:
-                filtered = search_by_substring(filtered, lambda h: h.get("bin_id", ""), query)
-            
-            # Sort data
-            if sort_val == "Recent First":
-                filtered.reverse()
-            elif sort_val == "Bin ID":
-                filtered = merge_sort(filtered, key=lambda h: h.get("bin_id", ""))
-            elif sort_val == "Distance":
-                filtered = merge_sort(filtered, key=lambda h: h.get("distance", 0))
-                filtered.reverse()
-            elif sort_val == "CO2 Saved":
-                filtered = merge_sort(filtered, key=lambda h: h.get("co2", 0))
-                filtered.reverse()
+            # Filter by status, type, area and bin ID (posting lists, no scan)
+            selection = state.history_index.select(
+                status=filter_status,
+                waste_type=None if type_val == "All" else type_val,
+                bin_query=search.value or "",
+                area_query=area.value or ""
+            )
+            total = sum(len(postings) for postings in selection.postings)
+            if prepare_fn:
+                prepare_fn(selection.groups)
             
             # Display metrics if function provided
             if metrics_fn and metrics_container:
-                metrics_fn(filtered, metrics_container)
-            
-            # Prepare table data
-            df = pd.DataFrame(filtered) if filtered else pd.DataFrame()
-            if not df.empty and enrich_fn:
-                # Format numeric columns
-                if 'distance' in df.columns:
-                    df['distance'] = df['distance'].apply(lambda x: f"{x:.2f}")
-                if 'co2' in df.columns:
-                    df['co2'] = df['co2'].apply(lambda x: f"{x:.2f}")
+                metrics_container.clear()
+                metrics_fn(selection.groups, total, metrics_container)
             
-            rows = df.to_dict('records') if not df.empty else []
+            page = min(max(1, pagination.get("page", 1)), max(1, -(-total // rows_per_page)))
+            records = state.history_index.page(
+                selection, offset=(page - 1) * rows_per_page, limit=rows_per_page,
+                **sort_options[sort_by.value]
+            )
             
-            # Render table
-            with table_container:
-                ui.table(
-                    columns=columns,
-                    rows=rows,
-                    pagination=10
-                ).classes("w-full").props('flat bordered dense separator="cell"')
+            # Enrich and format the visible rows only
+            if enrich_fn:
+                records = enrich_fn(records)
+            table.pagination = {**pagination, "page": page, "rowsPerPage": rows_per_page, "rowsNumber": total}
+            table.update_rows(records, clear_selection=False)
+        
+        def reload_first_page():
+            load_page({**table.pagination, "page": 1})
         
         # Attach event handlers
-        search.on_value_change(refresh_table)
-        area.on_value_change(refresh_table)
-        type_filter.on_value_change(refresh_table)
-        sort_by.on_value_change(refresh_table)
+        table.on('request', lambda e: load_page(e.args['pagination']))
+        search.on_value_change(reload_first_page)
+        area.on_value_change(reload_first_page)
+        type_filter.on_value_change(reload_first_page)
+        sort_by.on_value_change(reload_first_page)
         
         # Initial render
-        refresh_table()
+        load_page(table.pagination)
+    
+    return lambda: load_page(table.pagination)
 
 
 # Main history view rendering function
-def render_history(history, get_distance_to_depot_fn):
-    """Render the history view."""
+def render_history(distances_to_depot_fn):
+    """
+    Render the history view. Returns update_bins(changed), which reloads
+    the visible page of every tab in place.
+    """
     ui.label("Collection History").classes("text-2xl font-bold mb-4")
     
     # Metrics container for dispatch tab
@@ -142,28 +133,41 @@ def render_history(history, get_distance_to_depot_fn):
         tab_update = ui.tab("Update Bin History")
         tab_request = ui.tab("Request History")
     
+    reloads = []
     with ui.tab_panels(tabs, value=tab_dispatch).classes("w-full bg-transparent"):
         # Dispatch History Tab
         with ui.tab_panel(tab_dispatch).classes("p-0"):
+            area_km = {}  # area string -> km from the depot (0 if unparsable)
+
+            def measure_areas(groups):
+                """Compute depot distances for areas not seen yet."""
+                # parse coordinates first, then compute all distances in one call
+                missing = []
+                lats, lons = [], []
+                for key, _ in groups:
+                    if key.area in area_km:
+                        continue
+                    area_km[key.area] = 0.0
+                    try:
+                        lat_str, lon_str = key.area.split(",")
+                        lat, lon = float(lat_str), float(lon_str)
+                    except:
+                        continue
+                    missing.append(key.area)
+                    lats.append(lat)
+                    lons.append(lon)
+                for a, d in zip(missing, distances_to_depot_fn(lats, lons) if missing else []):
+                    area_km[a] = float(d)
+
             def enrich_dispatch(data):
-                """Enrich dispatch data with distance and CO2."""
-                enriched = []
-                for h in data:
-                    dist = 0.0
-                    if "area" in h:
-                        try:
-                            lat_str, lon_str = h["area"].split(",")
-                            dist = get_distance_to_depot_fn(float(lat_str), float(lon_str))
-                        except:
-                            dist = 0.0
-                    enriched.append({**h, "distance": dist, "co2": 2.5})
-                return enriched
+                """Enrich dispatch data with distance and CO2 (formatted for the table)."""
+                return [{**h, "distance": f"{area_km.get(h.get('area', ''), 0.0):.2f}", "co2": f"{2.5:.2f}"}
+                        for h in data]
             
-            def display_dispatch_metrics(data, container):
+            def display_dispatch_metrics(groups, total, container):
                 """Display metrics for dispatch history."""
-                total = len(data)
-                total_dist = sum(h.get("distance", 0) for h in data)
-                total_co2 = sum(h.get("co2", 0) for h in data)
+                total_dist = sum(area_km.get(key.area, 0.0) * len(postings) for key, postings in groups)
+                total_co2 = 2.5 * total
                 
                 with container:
                     with ui.card().classes("flex-1 p-3 bg-blue-50"):
@@ -176,30 +180,40 @@ def render_history(history, get_distance_to_depot_fn):
                         ui.label("CO2 Saved").classes("text-xs text-gray-500")
                         ui.label(f"{total_co2:.2f} kg").classes("text-xl font-bold")
             
-            render_history_tab(
-                history=history,
+            reloads.append(render_history_tab(
                 columns=HISTORY_DISPATCH_COLUMNS,
                 filter_status="Collected",
-                sort_options=["Recent First", "Bin ID", "Distance", "CO2 Saved"],
+                sort_options={
+                    **BASE_SORTS,
+                    # farthest first; equal distances newest first
+                    "Distance": {"order_by": lambda key: area_km.get(key.area, 0.0), "reverse": True},
+                    # every dispatch saves the same CO2, so this is newest first
+                    "CO2 Saved": {},
+                },
                 enrich_fn=enrich_dispatch,
+                prepare_fn=measure_areas,
                 metrics_container=dispatch_metrics,
                 metrics_fn=display_dispatch_metrics
-            )
+            ))
 
         # Update Bin History Tab
         with ui.tab_panel(tab_update).classes("p-0"):
-            render_history_tab(
-                history=history,
+            reloads.append(render_history_tab(
                 columns=HISTORY_UPDATE_COLUMNS,
                 filter_status=["Updated", "IoT Update"],
-                sort_options=["Recent First", "Bin ID"]
-            )
+                sort_options=BASE_SORTS
+            ))
 
         # Request History Tab
         with ui.tab_panel(tab_request).classes("p-0"):
-            render_history_tab(
-                history=history,
+            reloads.append(render_history_tab(
                 columns=HISTORY_REQUEST_COLUMNS,
                 filter_status="Request Processed",
-                sort_options=["Recent First", "Bin ID"]
-            )
+                sort_options=BASE_SORTS
+            ))
+
+    def update_bins(changed):
+        for reload in reloads:
+            reload()
+
+    return update_bins
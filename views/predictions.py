@@ -3,14 +3,14 @@ from nicegui import ui
 import pandas as pd
 from services.predictor import OverflowPredictor
 
-def render_predictions(bins, history):
+def render_predictions(bins):
     """Render the overflow predictions view."""
     ui.label("Overflow Predictions").classes("text-2xl font-bold mb-4")
     ui.label("Predicted time until overflow based on waste type and fill level.").classes("text-sm text-gray-600 mb-4")
 
     predictor = OverflowPredictor()
     # Get predictions: list of (hours_remaining, bin_obj)
-    predictions = predictor.predict(bins, history)
+    predictions = predictor.predict(bins)
 
     # Convert to DataFrame for table
     data = []
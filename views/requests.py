@@ -1,30 +1,29 @@
 """Collection requests view for GreenBin application."""
 from nicegui import ui
 import state
+import storage
 from .tables import REQUESTS_COLUMNS, REQUESTS_STATUS_SLOT, REQUESTS_ACTIONS_SLOT
 
-def process_specific_request(bin_id, save_all, dispatch_bin_logic, refresh_ui):
+def process_specific_request(bin_id, save_all, dispatch_bin_logic):
     """Process a specific collection request."""
-    for i, r in enumerate(state.requests):
+    for r in state.requests:
         if r.bin_id == bin_id:
-            req = state.requests.pop(i)
-            state.request_stack.append(("request_approve", req))
-            save_all()
+            state.remove_request(r)
+            state.request_stack.append(("request_approve", r))
+            save_all("requests")
             dispatch_bin_logic(bin_id, skip_undo=True)
             ui.notify(f"Processed request for {bin_id}", color="positive")
-            refresh_ui()
             return
 
 
-def reject_specific_request(bin_id, save_all, refresh_ui):
+def reject_specific_request(bin_id, save_all):
     """Reject a specific collection request."""
-    for i, r in enumerate(state.requests):
+    for r in state.requests:
         if r.bin_id == bin_id:
-            req = state.requests.pop(i)
-            state.request_stack.append(("request_reject", req))
-            save_all()
+            state.remove_request(r)
+            state.request_stack.append(("request_reject", r))
+            save_all("requests")
             ui.notify(f"Rejected request for {bin_id}", color="info")
-            refresh_ui()
             return
 
 
@@ -38,7 +37,7 @@ def render_requests(process_request_action, process_specific_request_fn, reject_
     # Stats overview
     total_requests = len(state.requests)
     pending_requests = len([r for r in state.requests if r.status == "Pending"])
-    processed_requests = len([h for h in state.history if h.get("action") == "Processed" or h.get("status") == "Request Processed"])
+    processed_requests = storage.count_history(status="Request Processed")
     
     with ui.row().classes("w-full gap-4 mb-6"):
         with ui.card().classes("flex-1 p-4 shadow-sm"):
@@ -114,7 +114,7 @@ REQUESTS_ACTIONS_SLOT = r'''
 BINS_COLUMNS = [
     {"name": "id", "label": "Bin ID", "field": "id", "align": "left", "sortable": True},
     {"name": "type", "label": "Waste Type", "field": "waste_type", "align": "left", "sortable": True},
-    {"name": "loc", "label": "Location", "field": "location", "align": "left"},
+    {"name": "loc", "label": "Location", "field": "location", "align": "left", "sortable": True},
     {"name": "fill", "label": "Fill Level", "field": "fill_level", "align": "center", "sortable": True},
     {"name": "status", "label": "Status", "field": "status", "align": "center"},
     {"name": "actions", "label": "Actions", "field": "actions", "align": "center"}